@@ -3,13 +3,213 @@ AI Fusion 分析模块
 包含智能模型选择和质量分析功能
 """
 
+import os
 import json
+import math
 import re
+import string
+import time
 import asyncio
 import hashlib
-from typing import List, Dict, Any, Optional, Tuple
+import logging
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from functools import lru_cache
+from operator import attrgetter, itemgetter
+from contextvars import ContextVar
+from typing import List, Dict, Any, Optional, Tuple, Set, Callable, Awaitable
 from dataclasses import dataclass
 
+logger = logging.getLogger(__name__)
+
+try:
+    import xxhash
+except ImportError:  # 可选依赖，未安装时退回 blake2b
+    xxhash = None
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，未安装时退回标准库 json
+    orjson = None
+
+
+# ============================================
+# 预编译正则
+# ============================================
+
+# 句子拆分：处理中英文标点
+_SENTENCE_SPLIT_RE = re.compile(r'[。！？!?]+|(?<=[.!?])\s+')
+# 抽取式摘要的断句：保留句末标点，便于按原文顺序拼回
+_SALIENT_SPLIT_RE = re.compile(r'(?<=[。！？；\n])|(?<=[.!?;]\s)')
+# 词语抽取：单字中文 + 英文/数字词
+_TOKEN_RE = re.compile(r'[\u4e00-\u9fff]|[A-Za-z]+(?:\'[A-Za-z]+)?|[0-9]+')
+# 未包裹代码块时的裸 JSON 数组
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+# 文本评估响应中的各维度评分
+_SCORE_PATTERNS = {
+    'completeness': re.compile(r'完整性评分[：:]\s*(\d+\.?\d*)'),
+    'accuracy': re.compile(r'准确性评分[：:]\s*(\d+\.?\d*)'),
+    'clarity': re.compile(r'清晰度评分[：:]\s*(\d+\.?\d*)'),
+    'relevance': re.compile(r'相关性评分[：:]\s*(\d+\.?\d*)'),
+    'overall': re.compile(r'综合评分[：:]\s*(\d+\.?\d*)'),
+}
+# 文本评估响应中的各维度优缺点段落
+_SECTION_PATTERNS = {
+    key: re.compile(
+        rf"【{label}】\s*✅ 优点:\s*(.*?)\s*❌ 不足:\s*(.*?)(?=\n\s*【|\n\s*\*\*|$)", re.S
+    )
+    for key, label in (
+        ('completeness', '完整性'),
+        ('accuracy', '准确性'),
+        ('clarity', '清晰度'),
+        ('relevance', '相关性'),
+    )
+}
+_UNIQUE_SECTION_RE = re.compile(r"\*\*独特特征：\*\*\s*(.*?)(?=\n\s*\*\*|$)", re.S)
+_SUGGESTION_SECTION_RE = re.compile(r"\*\*核心建议：\*\*\s*(.*)", re.S)
+_LEADING_STARS_RE = re.compile(r'^\*+\s*')
+_INSIGHT_SPLIT_RE = re.compile(r'[\n；;]+')
+_SUGGESTION_PREFIX_RE = re.compile(r'^[\d\.\-\*、]+\s*')
+# 相似度 / 关键词统计使用的词语切分
+_WORD_RE = re.compile(r'[\w\u4e00-\u9fff]+')
+# 结构模式：列表项与标题都锚定行首且首字符互斥，合并为一次扫描，按命中分组计数；
+# 代码可出现在行内任意位置（含标题行内），单独扫描
+_LINE_STRUCTURE_RE = re.compile(
+    r'^(?:(?P<list>[•\-\*\d+\.\)]\s+)|(?P<header>[#]+\s+|\*\*.*\*\*|【.*】))', re.MULTILINE
+)
+_CODE_RE = re.compile(r'```|`[^`]+`')
+
+
+# ============================================
+# 文本计数
+# ============================================
+
+@lru_cache(maxsize=256)
+def _count_stats(content: str) -> Tuple[int, int, int, int, int]:
+    """
+    统计 (字符数, 词数, 句数, 不同词数, 词总字符数)
+
+    同一回答会被基础指标、批量评估等多处统计，按文本缓存结果；
+    分词与断句交给预编译正则在 C 层完成，不再构造中间的句子列表
+    """
+    sentence_count = sum(
+        1 for part in _SENTENCE_SPLIT_RE.split(content) if part and not part.isspace()
+    ) or 1
+
+    # 词语抽取：单字中文 + 英文/数字词
+    tokens = _TOKEN_RE.findall(content.lower())
+    return len(content), len(tokens), sentence_count, len(set(tokens)), len("".join(tokens))
+
+
+@lru_cache(maxsize=256)
+def _extract_salient(text: str, query: str, max_chars: int) -> str:
+    """
+    超长回答的抽取式摘要：按 BM25 计算各句与问题的相关度，
+    首句始终保留，其余按得分从高到低选入，再按原文顺序拼接，总长不超过 max_chars
+    """
+    if len(text) <= max_chars:
+        return text
+
+    sentences = [sentence for sentence in _SALIENT_SPLIT_RE.split(text) if sentence.strip()]
+    if not sentences:
+        return text.strip()[:max_chars]
+    if len(sentences[0]) >= max_chars:
+        return sentences[0][:max_chars] + "..."
+
+    query_tokens = set(_TOKEN_RE.findall(query.lower()))
+    sentence_counts = [Counter(_TOKEN_RE.findall(sentence.lower())) for sentence in sentences]
+    lengths = [sum(counts.values()) for counts in sentence_counts]
+    avg_length = sum(lengths) / len(sentences) or 1.0
+
+    n = len(sentences)
+    idf = {}
+    for token in query_tokens:
+        df = sum(1 for counts in sentence_counts if token in counts)
+        idf[token] = math.log((n - df + 0.5) / (df + 0.5) + 1)
+
+    k1, b = 1.2, 0.75
+
+    def bm25(i: int) -> float:
+        counts = sentence_counts[i]
+        norm = k1 * (1 - b + b * lengths[i] / avg_length)
+        return sum(
+            idf[token] * counts[token] * (k1 + 1) / (counts[token] + norm)
+            for token in query_tokens if token in counts
+        )
+
+    chosen = [0]
+    used = len(sentences[0])
+    for i in sorted(range(1, n), key=lambda i: (-bm25(i), i)):
+        if used + len(sentences[i]) <= max_chars:
+            chosen.append(i)
+            used += len(sentences[i])
+
+    parts: List[str] = []
+    previous = -1
+    for i in sorted(chosen):
+        if previous >= 0 and i != previous + 1:
+            parts.append(" … ")
+        parts.append(sentences[i])
+        previous = i
+    return "".join(parts).strip()
+
+
+@lru_cache(maxsize=256)
+def _keyword_set(text: str) -> frozenset:
+    """提取文本的小写关键词集合（相似度与独特性计算共用，按文本缓存）"""
+    return frozenset(_WORD_RE.findall(text.lower()))
+
+
+# ============================================
+# JSON 编解码（优先使用 orjson）
+# ============================================
+
+_json_loads = orjson.loads if orjson is not None else json.loads
+
+def _extract_json_block(text: str) -> Optional[str]:
+    """提取第一个 ```json 代码块的内容（去掉首尾空白），没有完整代码块时返回 None"""
+    start = text.find("```json")
+    if start < 0:
+        return None
+
+    # 直接定位开闭围栏，不经过正则引擎，对超长或畸形响应也是线性扫描
+    start += len("```json")
+    end = text.find("```", start)
+    if end < 0:
+        return None
+    return text[start:end].strip()
+
+
+def _json_dumps_bytes(obj: Any) -> bytes:
+    """序列化为 UTF-8 JSON 字节（中文不转义）"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def _canonical_json(obj: Any) -> str:
+    """生成键有序的紧凑 JSON，用于缓存键"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS).decode("utf-8")
+    return json.dumps(obj, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+# ============================================
+# 非加密哈希（内部去重 / 内存缓存键）
+# ============================================
+
+def _fast_key(*parts: str) -> int:
+    """计算文本片段的 64 位指纹，仅用于进程内去重，不具备抗碰撞的安全性"""
+    if xxhash is not None:
+        h = xxhash.xxh3_64()
+    else:
+        h = hashlib.blake2b(digest_size=8)
+    for part in parts:
+        h.update(part.encode("utf-8"))
+        h.update(b"|")
+    return int.from_bytes(h.digest(), "big")
+
 
 # ============================================
 # 向后兼容: ModelConfig 定义
@@ -26,10 +226,411 @@ class ModelConfig:
     temperature: float = 0.7
 
 
+# ============================================
+# LLM 响应缓存（L1 内存 LRU + 可选 L2 磁盘 JSON）
+# ============================================
+
+_LLM_CACHE_POLICIES = ("enabled", "replay", "write_only", "disabled")
+
+
+@dataclass
+class LLMCacheConfig:
+    """LLM 响应缓存配置"""
+    maxsize: int = 1000
+    ttl: float = 3600.0              # 过期时间（秒）
+    max_temperature: float = 0.5     # 温度高于该值时不缓存（输出随机性大）
+    disk_dir: Optional[str] = None   # L2 磁盘缓存目录，None 表示仅使用内存
+    # 读写策略：enabled（读写）/ replay（只读，未命中报错，忽略过期）/
+    # write_only（总是请求并覆盖写入）/ disabled（不使用缓存）
+    policy: str = "enabled"
+
+    @classmethod
+    def conservative(cls) -> "LLMCacheConfig":
+        """保守配置：5分钟过期"""
+        return cls(maxsize=500, ttl=300.0)
+
+    @classmethod
+    def aggressive(cls) -> "LLMCacheConfig":
+        """激进配置：24小时过期"""
+        return cls(maxsize=5000, ttl=86400.0)
+
+    @classmethod
+    def from_env(cls) -> "LLMCacheConfig":
+        """根据 LLM_CACHE_MODE / LLM_CACHE_DIR / LLM_CACHE_POLICY 环境变量构建配置"""
+        mode = os.getenv("LLM_CACHE_MODE", "").strip().lower()
+        if mode == "conservative":
+            config = cls.conservative()
+        elif mode == "aggressive":
+            config = cls.aggressive()
+        else:
+            config = cls()
+        config.disk_dir = os.getenv("LLM_CACHE_DIR") or None
+
+        policy = os.getenv("LLM_CACHE_POLICY", "").strip().lower()
+        if policy in _LLM_CACHE_POLICIES:
+            config.policy = policy
+        elif policy:
+            logger.warning("⚠️ 未知的 LLM_CACHE_POLICY=%s，使用 enabled", policy)
+        # 回放/录制需要跨进程保留结果，未指定目录时默认落盘到 .llm_cache
+        if config.policy in ("replay", "write_only") and not config.disk_dir:
+            config.disk_dir = ".llm_cache"
+        return config
+
+
+class LLMResponseCache:
+    """
+    两级 LLM 响应缓存
+    键为 sha256(model | messages | temperature | max_tokens | 其余请求参数)，值为响应文本
+
+    读写均为同步字典操作（中间没有 await），在单事件循环内天然互斥，无需额外加锁
+    """
+
+    def __init__(self, config: Optional[LLMCacheConfig] = None):
+        self.config = config or LLMCacheConfig.from_env()
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+
+    # 只影响传输、不影响生成结果的参数，不计入缓存键
+    _TRANSPORT_KWARGS = frozenset({"max_retries", "timeout", "extra_headers"})
+
+    @classmethod
+    def make_key(
+        cls,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: Optional[int],
+        options: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """生成确定性的缓存键；top_p、stop、seed 等其余请求参数一并计入"""
+        canonical = _canonical_json(messages)
+        raw = f"{model}|{canonical}|{temperature}|{max_tokens}"
+        request_options = {
+            key: value for key, value in (options or {}).items() if key not in cls._TRANSPORT_KWARGS
+        }
+        if request_options:
+            raw += f"|{_canonical_json(request_options)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    @property
+    def readable(self) -> bool:
+        """当前策略是否允许读取缓存"""
+        return self.config.policy in ("enabled", "replay")
+
+    @property
+    def writable(self) -> bool:
+        """当前策略是否允许写入缓存"""
+        return self.config.policy in ("enabled", "write_only")
+
+    def is_cacheable(self, temperature: float, kwargs: Dict[str, Any]) -> bool:
+        """判断本次调用是否可以走缓存"""
+        if self.config.policy == "disabled":
+            return False
+        if temperature > self.config.max_temperature:
+            return False
+        if kwargs.get("stream") or kwargs.get("tools"):
+            return False
+        return True
+
+    def get(self, key: str) -> Optional[str]:
+        """读取缓存：先查内存，再查磁盘"""
+        now = time.time()
+        # 回放模式下录制结果不过期
+        ttl = float("inf") if self.config.policy == "replay" else self.config.ttl
+        entry = self._entries.get(key)
+        if entry is not None:
+            created_at, text = entry
+            if now - created_at <= ttl:
+                self._entries.move_to_end(key)
+                return text
+            del self._entries[key]
+
+        if self.config.disk_dir:
+            path = os.path.join(self.config.disk_dir, f"{key}.json")
+            try:
+                with open(path, "rb") as f:
+                    payload = _json_loads(f.read())
+                created_at = float(payload["created_at"])
+                if now - created_at <= ttl:
+                    self._store_memory(key, created_at, payload["text"])
+                    return payload["text"]
+                os.remove(path)
+            except (OSError, ValueError, KeyError, TypeError):
+                pass
+
+        return None
+
+    def set(self, key: str, text: str) -> None:
+        """写入缓存（内存 + 可选磁盘）"""
+        created_at = time.time()
+        self._store_memory(key, created_at, text)
+
+        if self.config.disk_dir:
+            try:
+                os.makedirs(self.config.disk_dir, exist_ok=True)
+                path = os.path.join(self.config.disk_dir, f"{key}.json")
+                with open(path, "wb") as f:
+                    f.write(_json_dumps_bytes({"created_at": created_at, "text": text}))
+            except OSError as exc:
+                logger.warning("⚠️ LLM 磁盘缓存写入失败: %s", exc)
+
+    def clear(self) -> None:
+        """清空内存缓存"""
+        self._entries.clear()
+
+    def _store_memory(self, key: str, created_at: float, text: str) -> None:
+        self._entries[key] = (created_at, text)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.config.maxsize:
+            self._entries.popitem(last=False)
+
+
+# 全局缓存实例
+_LLM_CACHE = LLMResponseCache()
+
+
+# ============================================
+# 并发控制与重试
+# ============================================
+
+# 质量评估调用的最大并发数（类似 OLLAMA_NUM_PARALLEL，可按服务商限流调整）
+_EVAL_SEM = asyncio.Semaphore(int(os.environ.get("LLM_EVAL_CONCURRENCY", "8")))
+
+# 跨请求合并单项评估（仅在服务模式下并发请求较多时有收益，默认关闭）
+_DYNAMIC_BATCH_ENABLED = os.getenv("QA_DYNAMIC_BATCH", "0") == "1"
+
+
+class _DynamicBatcher:
+    """
+    动态合批器：同一 key 下的条目攒够 batch_size 或等待 max_wait_ms 后，
+    交给 flush 回调一次性处理，再把结果按顺序分发给各个等待方
+    """
+
+    def __init__(self, batch_size: int = 8, max_wait_ms: float = 50.0):
+        self.batch_size = batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queues: Dict[Any, List[Tuple[Any, asyncio.Future]]] = {}
+        self._flushers: Dict[Any, Callable[[List[Any]], Awaitable[List[Any]]]] = {}
+        self._timers: Dict[Any, asyncio.TimerHandle] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    async def submit(
+        self,
+        key: Any,
+        item: Any,
+        flush: Callable[[List[Any]], Awaitable[List[Any]]]
+    ) -> Any:
+        """提交一个条目并等待其所在批次的处理结果"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queue = self._queues.setdefault(key, [])
+        queue.append((item, future))
+        self._flushers[key] = flush
+
+        if len(queue) >= self.batch_size:
+            self._flush(key)
+        elif key not in self._timers:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key: Any) -> None:
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._queues.pop(key, [])
+        flush = self._flushers.pop(key, None)
+        if batch and flush is not None:
+            task = asyncio.ensure_future(self._run(flush, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, flush, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            results = await flush([item for item, _ in batch])
+        except Exception as exc:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+_EVAL_BATCHER = _DynamicBatcher()
+
+
+class _TokenBucket:
+    """
+    请求数 / token 数双令牌桶（按分钟匀速补充），在发起请求前排队等待额度，
+    避免并发分析时突破服务商的 RPM / TPM 限制而触发 429 重试
+    rpm / tpm 为 0 表示不限制
+    """
+
+    def __init__(self, rpm: float = 0, tpm: float = 0):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.request_tokens = float(rpm)
+        self.token_tokens = float(tpm)
+        self.last_update = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rpm > 0 or self.tpm > 0
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.last_update = now
+        if self.rpm > 0:
+            self.request_tokens = min(self.rpm, self.request_tokens + elapsed * self.rpm / 60)
+        if self.tpm > 0:
+            self.token_tokens = min(self.tpm, self.token_tokens + elapsed * self.tpm / 60)
+
+    async def acquire(self, estimated_tokens: int) -> None:
+        """等待直到有 1 个请求额度和 estimated_tokens 个 token 额度（按先来先到排队）"""
+        if not self.enabled:
+            return
+        # 单次请求超过桶容量时按容量计，避免永远等不到
+        if self.tpm > 0:
+            estimated_tokens = min(estimated_tokens, self.tpm)
+
+        async with self._lock:
+            while True:
+                self._refill()
+                wait = 0.0
+                if self.rpm > 0 and self.request_tokens < 1:
+                    wait = (1 - self.request_tokens) * 60 / self.rpm
+                if self.tpm > 0 and self.token_tokens < estimated_tokens:
+                    wait = max(wait, (estimated_tokens - self.token_tokens) * 60 / self.tpm)
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+
+            if self.rpm > 0:
+                self.request_tokens -= 1
+            if self.tpm > 0:
+                self.token_tokens -= estimated_tokens
+
+
+# 进程级限流（默认关闭），所有未命中缓存的 call_llm_async 请求共用
+_LLM_RATE_LIMITER = _TokenBucket(
+    rpm=float(os.getenv("LLM_RPM_LIMIT", "0")),
+    tpm=float(os.getenv("LLM_TPM_LIMIT", "0")),
+)
+
+_LLM_RETRY_ATTEMPTS = 3      # 最大尝试次数（含首次）
+_LLM_RETRY_BASE_WAIT = 1.0   # 指数退避初始等待（秒）
+_LLM_RETRY_MAX_WAIT = 8.0    # 指数退避最大等待（秒）
+
+
+# 值得重试的 HTTP 状态码：请求超时、冲突、限流，外加全部 5xx
+_RETRYABLE_STATUS_CODES = frozenset({408, 409, 429})
+
+
+@lru_cache(maxsize=1)
+def _transport_error_types() -> Tuple[type, ...]:
+    """连接/超时类异常类型（首次判断时才导入 SDK，APITimeoutError 是 APIConnectionError 的子类）"""
+    import httpx
+    import anthropic
+    import openai
+
+    return (httpx.TransportError, openai.APIConnectionError, anthropic.APIConnectionError)
+
+
+def _is_retryable_error(exc: Exception) -> bool:
+    """判断异常是否值得重试：超时、连接错误、408/409/429 或 5xx 服务端错误"""
+    if isinstance(exc, (asyncio.TimeoutError, *_transport_error_types())):
+        return True
+
+    status_code = getattr(exc, "status_code", None)
+    if status_code is None:
+        response = getattr(exc, "response", None)
+        status_code = getattr(response, "status_code", None)
+
+    return isinstance(status_code, int) and (status_code in _RETRYABLE_STATUS_CODES or status_code >= 500)
+
+
+# ============================================
+# Token 计数（tiktoken 为可选依赖）
+# ============================================
+
+_TOKEN_ENCODERS: Dict[str, Any] = {}
+
+
+def _get_token_encoder(model: str):
+    """懒加载并按模型缓存 tiktoken 编码器，未安装 tiktoken 时返回 None"""
+    if model in _TOKEN_ENCODERS:
+        return _TOKEN_ENCODERS[model]
+
+    try:
+        import tiktoken
+    except ImportError:
+        encoder = None
+    else:
+        try:
+            encoder = tiktoken.encoding_for_model(model)
+        except KeyError:
+            # 非 OpenAI 模型使用通用编码近似
+            encoder = tiktoken.get_encoding("cl100k_base")
+
+    _TOKEN_ENCODERS[model] = encoder
+    return encoder
+
+
+def _count_tokens(text: str, model: str) -> int:
+    """统计文本 token 数；无 tiktoken 时按字符数估算（中文约1字符1token，偏保守）"""
+    encoder = _get_token_encoder(model)
+    if encoder is None:
+        return len(text)
+    return len(encoder.encode(text))
+
+
 # ============================================
 # LLM 调用函数(兼容旧代码)
 # ============================================
 
+# 当前 Langfuse 追踪上下文（trace_id / parent_observation_id），随异步任务自动传播
+_TRACE_CTX: ContextVar[Optional[Dict[str, Optional[str]]]] = ContextVar("llm_trace_ctx", default=None)
+
+
+@contextmanager
+def trace_scope(trace_id: Optional[str], parent_observation_id: Optional[str] = None):
+    """在当前上下文中设置追踪信息，退出时恢复；并发子任务各自继承一份副本"""
+    token = _TRACE_CTX.set({
+        "trace_id": trace_id,
+        "parent_observation_id": parent_observation_id,
+    })
+    try:
+        yield
+    finally:
+        _TRACE_CTX.reset(token)
+
+# 未显式传入 registry 时复用的进程级默认实例（只发现一次模型）
+_DEFAULT_REGISTRY = None
+_REGISTRY_LOCK = asyncio.Lock()
+
+
+async def _get_default_registry():
+    """获取（必要时创建并初始化）默认 ModelRegistry"""
+    global _DEFAULT_REGISTRY
+    from providers import ModelRegistry
+
+    async with _REGISTRY_LOCK:
+        if _DEFAULT_REGISTRY is None:
+            registry = ModelRegistry()
+            await registry.discover_all_models()
+            _DEFAULT_REGISTRY = registry
+    return _DEFAULT_REGISTRY
+
+
+def reset_default_registry() -> None:
+    """重置默认 ModelRegistry（环境变量变化后或测试中使用）"""
+    global _DEFAULT_REGISTRY
+    _DEFAULT_REGISTRY = None
+
+
 async def call_llm_async(
     messages,
     model,
@@ -40,44 +641,94 @@ async def call_llm_async(
     return_response_obj: bool = False,
     parent_observation_id: Optional[str] = None,
     langfuse_metadata: Optional[Dict[str, Any]] = None,
+    use_cache: bool = True,
+    retry: bool = True,
+    semaphore: Optional[asyncio.Semaphore] = None,
     **kwargs
 ):
     """
     兼容的 LLM 调用函数
     实际调用 providers.ModelRegistry
 
+    低温度（<= 0.5）的纯文本调用会命中 _LLM_CACHE；
+    需要完整响应对象、流式或工具调用时跳过缓存
+
     Args:
         messages: 消息列表
         model: 模型ID
         max_tokens: 最大token数
         temperature: 温度参数
-        registry: ModelRegistry 实例 (可选，如果不提供会创建新实例)
-        trace_id: Langfuse trace ID (可选)
+        registry: ModelRegistry 实例 (可选，不提供时复用进程级默认实例)
+        trace_id: Langfuse trace ID (可选，未提供时从 _TRACE_CTX 继承)
         return_response_obj: 是否返回完整响应对象（包含 usage 等信息）
         parent_observation_id: Langfuse 父 span ID
         langfuse_metadata: 附加的 Langfuse 元数据
+        use_cache: 是否允许使用响应缓存
+        retry: 遇到超时/连接错误/408/409/429/5xx 时是否指数退避重试（启用时关闭 SDK 自带重试，避免两层重试叠加）
+        semaphore: 并发上限信号量（可选），仅在每次实际请求期间持有，退避等待时释放
         **kwargs: 其他参数
     """
-    from providers import ModelRegistry
-
-    # 如果没有提供 registry，创建一个新的（向后兼容）
+    cache_key = None
+    if use_cache and not return_response_obj and _LLM_CACHE.is_cacheable(temperature, kwargs):
+        try:
+            cache_key = _LLM_CACHE.make_key(model, messages, temperature, max_tokens, kwargs)
+        except TypeError:
+            # 请求参数无法序列化（如 response_format 传入类型对象）时不走缓存
+            cache_key = None
+    if cache_key is not None:
+        if _LLM_CACHE.readable:
+            cached_text = _LLM_CACHE.get(cache_key)
+            if cached_text is not None:
+                return cached_text
+        if _LLM_CACHE.config.policy == "replay":
+            raise RuntimeError(f"LLM 缓存回放未命中: {model}")
+
+    if trace_id is None:
+        trace_ctx = _TRACE_CTX.get() or {}
+        trace_id = trace_ctx.get("trace_id")
+        parent_observation_id = parent_observation_id or trace_ctx.get("parent_observation_id")
+
+    # 如果没有提供 registry，复用默认实例（向后兼容）
     if registry is None:
-        registry = ModelRegistry()
-        await registry.discover_all_models()
-
-    response = await registry.call_model(
-        model,
-        messages,
-        max_tokens=max_tokens,
-        temperature=temperature,
-        trace_id=trace_id,
-        parent_observation_id=parent_observation_id,
-        langfuse_metadata=langfuse_metadata,
-        **kwargs
-    )
+        registry = await _get_default_registry()
+
+    estimated_tokens = 0
+    if _LLM_RATE_LIMITER.enabled:
+        prompt_text = "".join(str(message.get("content", "")) for message in messages)
+        estimated_tokens = _count_tokens(prompt_text, model) + (max_tokens or 0)
+
+    attempts = _LLM_RETRY_ATTEMPTS if retry else 1
+    if attempts > 1:
+        # 重试由下方循环统一负责，SDK 客户端不再自行重试
+        kwargs.setdefault("max_retries", 0)
+    for attempt in range(1, attempts + 1):
+        # 每次尝试（含重试）都计入限流额度
+        await _LLM_RATE_LIMITER.acquire(estimated_tokens)
+        try:
+            async with semaphore or nullcontext():
+                response = await registry.call_model(
+                    model,
+                    messages,
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    trace_id=trace_id,
+                    parent_observation_id=parent_observation_id,
+                    langfuse_metadata=langfuse_metadata,
+                    **kwargs
+                )
+            break
+        except Exception as exc:
+            if attempt >= attempts or not _is_retryable_error(exc):
+                raise
+            delay = min(_LLM_RETRY_MAX_WAIT, _LLM_RETRY_BASE_WAIT * 2 ** (attempt - 1))
+            logger.warning("⚠️ 调用 %s 失败: %s，%.0f秒后重试 (%s/%s)", model, exc, delay, attempt, attempts - 1)
+            await asyncio.sleep(delay)
 
     if return_response_obj:
         return response
+
+    if cache_key is not None and response.text is not None and _LLM_CACHE.writable:
+        _LLM_CACHE.set(cache_key, response.text)
     return response.text
 
 
@@ -90,335 +741,451 @@ from dataclasses import dataclass
 # Imports handled in header
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ModelCapability:
     """模型能力描述"""
     name: str
     provider: str
-    strengths: List[str]
-    suitable_tasks: List[str]
+    strengths: Tuple[str, ...]
+    suitable_tasks: Tuple[str, ...]
     performance_profile: Dict[str, str]
-    special_features: List[str]
+    special_features: Tuple[str, ...]
+
+
+# 模型知识库 - 包含所有可用模型的详细能力描述（导入时构建一次，全局只读共享）
+_MODEL_KNOWLEDGE: Dict[str, ModelCapability] = {
+    # ============= Claude 系列 =============
+    "claude_sonnet4": ModelCapability(
+        name="claude_sonnet4",
+        provider="anthropic",
+        strengths=(
+            "逻辑推理能力卓越", "代码理解和生成顶尖", "复杂问题深度分析",
+            "创意写作优秀", "多步骤任务处理", "结构化输出精准",
+            "长文本理解", "细致的上下文把握"
+        ),
+        suitable_tasks=(
+            "编程和技术问题", "逻辑推理", "创意写作", "复杂分析",
+            "学术研究", "产品设计", "策略规划", "代码审查",
+            "系统架构设计", "技术文档编写"
+        ),
+        performance_profile={
+            "reasoning": "excellent",      # 推理能力：卓越
+            "creativity": "excellent",     # 创造力：卓越
+            "coding": "excellent",         # 编程能力：卓越
+            "factual": "good",             # 事实准确性：良好
+            "speed": "medium",             # 响应速度：中等
+            "context": "excellent"         # 上下文理解：卓越
+        },
+        special_features=("支持200K+长文本", "强逻辑推理链", "创意性强", "道德安全意识高")
+    ),
+
+    "claude37_sonnet_new": ModelCapability(
+        name="claude37_sonnet_new",
+        provider="anthropic",
+        strengths=(
+            "平衡的综合能力", "快速响应", "日常对话流畅",
+            "信息整理清晰", "中等复杂度任务", "稳定性好"
+        ),
+        suitable_tasks=(
+            "日常问答", "信息总结", "翻译", "简单分析",
+            "文档整理", "基础编程", "通用任务", "客服对话",
+            "内容润色", "快速原型开发"
+        ),
+        performance_profile={
+            "reasoning": "good",
+            "creativity": "good",
+            "coding": "good",
+            "factual": "good",
+            "speed": "fast",
+            "context": "good"
+        },
+        special_features=("响应快速", "稳定可靠", "平衡发展", "成本效益好")
+    ),
+
+    # ============= GPT 系列 =============
+    "gpt-41-0414-global": ModelCapability(
+        name="gpt-41-0414-global",
+        provider="openai",
+        strengths=(
+            "数学和科学计算强", "逻辑推理严谨", "结构化分析精确",
+            "代码优化能力", "技术文档处理", "多语言支持",
+            "工具调用能力", "函数调用精准"
+        ),
+        suitable_tasks=(
+            "数学问题", "科学计算", "算法设计", "数据分析",
+            "技术文档", "系统设计", "工程问题", "API开发",
+            "数据可视化", "统计分析"
+        ),
+        performance_profile={
+            "reasoning": "excellent",
+            "creativity": "good",
+            "coding": "excellent",
+            "factual": "excellent",
+            "speed": "medium",
+            "context": "excellent"
+        },
+        special_features=("数学能力强", "逻辑严谨", "技术导向", "128K上下文", "工具使用")
+    ),
+
+    "gpt-41-mini-0414-global": ModelCapability(
+        name="gpt-41-mini-0414-global",
+        provider="openai",
+        strengths=(
+            "极速响应", "轻量级任务", "日常对话",
+            "简单问答高效", "成本优化", "批量处理适合"
+        ),
+        suitable_tasks=(
+            "快速问答", "简单翻译", "基础对话", "信息查找",
+            "轻量级编程", "格式转换", "效率任务", "批量处理",
+            "实时对话", "快速原型"
+        ),
+        performance_profile={
+            "reasoning": "medium",
+            "creativity": "medium",
+            "coding": "good",
+            "factual": "good",
+            "speed": "very_fast",
+            "context": "good"
+        },
+        special_features=("极速响应", "资源节约", "简洁高效", "性价比极高")
+    ),
+
+    "gpt-5-mini-0807-global": ModelCapability(
+        name="gpt-5-mini-0807-global",
+        provider="openai",
+        strengths=(
+            "新一代轻量模型", "速度与质量平衡", "改进的推理能力",
+            "更好的指令遵循", "多任务处理", "成本效益优"
+        ),
+        suitable_tasks=(
+            "通用问答", "文本生成", "简单编程", "信息提取",
+            "对话系统", "内容审核", "分类任务", "摘要生成",
+            "情感分析", "实体识别"
+        ),
+        performance_profile={
+            "reasoning": "good",
+            "creativity": "good",
+            "coding": "good",
+            "factual": "good",
+            "speed": "very_fast",
+            "context": "good"
+        },
+        special_features=("GPT-5系列", "速度快", "质量提升", "指令遵循好")
+    ),
+
+    # ============= 通义千问系列 =============
+    "qwen-max": ModelCapability(
+        name="qwen-max",
+        provider="alibaba",
+        strengths=(
+            "中文理解顶尖", "知识覆盖广", "多语言支持强",
+            "文化语境理解深", "本土化内容精准", "推理能力强",
+            "长文本处理", "专业领域知识"
+        ),
+        suitable_tasks=(
+            "中文内容处理", "翻译任务", "文化相关问题",
+            "本土化内容", "多语言对话", "知识问答",
+            "专业文档", "学术研究", "商业分析"
+        ),
+        performance_profile={
+            "reasoning": "excellent",
+            "creativity": "good",
+            "coding": "good",
+            "factual": "excellent",
+            "speed": "medium",
+            "context": "excellent"
+        },
+        special_features=("中文优化", "知识丰富", "文化理解", "32K上下文")
+    ),
+
+    "qwen-plus": ModelCapability(
+        name="qwen-plus",
+        provider="alibaba",
+        strengths=(
+            "中文处理优秀", "平衡性能好", "多领域知识",
+            "实用性强", "性价比高", "响应稳定"
+        ),
+        suitable_tasks=(
+            "中文问答", "通用任务", "知识整理",
+            "实用工具", "日常助手", "信息处理",
+            "内容生成", "文本分析"
+        ),
+        performance_profile={
+            "reasoning": "good",
+            "creativity": "good",
+            "coding": "good",
+            "factual": "good",
+            "speed": "fast",
+            "context": "good"
+        },
+        special_features=("中文友好", "实用导向", "性价比高", "稳定可靠")
+    ),
+
+    "qwen3-max-preview": ModelCapability(
+        name="qwen3-max-preview",
+        provider="alibaba",
+        strengths=(
+            "第三代架构", "推理能力增强", "多模态理解",
+            "代码能力提升", "知识更新", "长文本优化"
+        ),
+        suitable_tasks=(
+            "复杂推理", "代码生成", "多模态分析",
+            "长文档处理", "专业问答", "创新设计",
+            "技术研究", "数据分析"
+        ),
+        performance_profile={
+            "reasoning": "excellent",
+            "creativity": "excellent",
+            "coding": "excellent",
+            "factual": "excellent",
+            "speed": "medium",
+            "context": "excellent"
+        },
+        special_features=("Qwen3架构", "多模态", "长文本", "最新技术")
+    ),
+
+    # ============= 智谱AI系列 =============
+    "glm-4.5": ModelCapability(
+        name="glm-4.5",
+        provider="zhipu",
+        strengths=(
+            "多模态能力强", "视觉理解好", "综合分析能力",
+            "创新性思维", "中文优化", "跨媒体处理"
+        ),
+        suitable_tasks=(
+            "多模态任务", "创新设计", "综合分析",
+            "图文理解", "跨领域问题", "创意项目",
+            "视觉问答", "内容创作"
+        ),
+        performance_profile={
+            "reasoning": "good",
+            "creativity": "excellent",
+            "coding": "good",
+            "factual": "good",
+            "speed": "medium",
+            "context": "good"
+        },
+        special_features=("多模态", "创新思维", "综合能力", "中文优秀")
+    ),
+
+    # ============= Qwen3-Coder系列 (代码专精) =============
+    "qwen3-coder-480b-a35b-instruct": ModelCapability(
+        name="qwen3-coder-480b-a35b-instruct",
+        provider="alibaba",
+        strengths=(
+            "代码生成顶尖", "算法理解深", "多语言编程",
+            "代码补全精准", "bug修复能力", "架构设计",
+            "480B参数规模", "指令遵循好"
+        ),
+        suitable_tasks=(
+            "代码生成", "算法实现", "代码审查", "bug修复",
+            "重构优化", "技术文档", "API设计", "测试编写",
+            "性能优化", "架构设计"
+        ),
+        performance_profile={
+            "reasoning": "excellent",
+            "creativity": "good",
+            "coding": "outstanding",     # 编程能力：杰出
+            "factual": "excellent",
+            "speed": "medium",
+            "context": "excellent"
+        },
+        special_features=("480B超大规模", "代码专精", "多语言", "指令遵循")
+    ),
+
+    "qwen3-coder-plus1": ModelCapability(
+        name="qwen3-coder-plus1",
+        provider="alibaba",
+        strengths=(
+            "代码生成优秀", "编程效率高", "多语言支持",
+            "快速开发", "实用导向", "性价比好"
+        ),
+        suitable_tasks=(
+            "快速开发", "代码补全", "简单重构", "脚本编写",
+            "工具开发", "自动化任务", "原型开发", "代码转换"
+        ),
+        performance_profile={
+            "reasoning": "good",
+            "creativity": "medium",
+            "coding": "excellent",
+            "factual": "good",
+            "speed": "fast",
+            "context": "good"
+        },
+        special_features=("代码优化", "快速响应", "实用性强", "性价比高")
+    ),
+
+    "qwen3-coder-plus": ModelCapability(
+        name="qwen3-coder-plus",
+        provider="alibaba",
+        strengths=(
+            "代码能力强", "平衡性能", "多场景适用",
+            "开发效率", "稳定可靠"
+        ),
+        suitable_tasks=(
+            "通用编程", "代码生成", "技术问答", "开发辅助",
+            "代码解释", "学习辅导", "代码优化"
+        ),
+        performance_profile={
+            "reasoning": "good",
+            "creativity": "medium",
+            "coding": "excellent",
+            "factual": "good",
+            "speed": "fast",
+            "context": "good"
+        },
+        special_features=("代码能力", "平衡发展", "稳定性好", "实用")
+    ),
+
+    # ============= OpenMatrix系列 (开源生态) =============
+    "openmatrix-qwen3-235b-inst-fp8": ModelCapability(
+        name="openmatrix-qwen3-235b-inst-fp8",
+        provider="openmatrix",
+        strengths=(
+            "超大规模235B", "指令遵循精准", "FP8优化",
+            "推理效率高", "知识广博", "多任务能力"
+        ),
+        suitable_tasks=(
+            "复杂推理", "专业问答", "深度分析", "知识整合",
+            "多步骤任务", "系统设计", "研究辅助", "创新思考"
+        ),
+        performance_profile={
+            "reasoning": "excellent",
+            "creativity": "good",
+            "coding": "good",
+            "factual": "excellent",
+            "speed": "medium",
+            "context": "excellent"
+        },
+        special_features=("235B规模", "FP8量化", "开源生态", "高效推理")
+    )
+}
 
 
-class AIFusionSmartSelector:
-    """AI Fusion智能模型选择器"""
+def _format_desc(name: str, capability: ModelCapability) -> str:
+    """格式化单个模型的能力描述（用于选择提示）"""
+    return f"""
+**{name}**:
+- 核心优势: {', '.join(capability.strengths)}
+- 适合任务: {', '.join(capability.suitable_tasks)}
+- 性能特点: 推理能力{capability.performance_profile['reasoning']}, 创造力{capability.performance_profile['creativity']}, 编程能力{capability.performance_profile['coding']}, 事实准确性{capability.performance_profile['factual']}, 响应速度{capability.performance_profile['speed']}
+- 特殊功能: {', '.join(capability.special_features)}
+"""
 
-    def __init__(self, registry=None):
-        self.analyzer_model = "claude_sonnet4"  # 用于分析的模型
-        self.model_knowledge = self._build_model_knowledge()
-        self.registry = registry  # ModelRegistry 实例
-    
-    def _build_model_knowledge(self) -> Dict[str, ModelCapability]:
-        """构建模型知识库 - 包含所有可用模型的详细能力描述"""
-        return {
-            # ============= Claude 系列 =============
-            "claude_sonnet4": ModelCapability(
-                name="claude_sonnet4",
-                provider="anthropic",
-                strengths=[
-                    "逻辑推理能力卓越", "代码理解和生成顶尖", "复杂问题深度分析",
-                    "创意写作优秀", "多步骤任务处理", "结构化输出精准",
-                    "长文本理解", "细致的上下文把握"
-                ],
-                suitable_tasks=[
-                    "编程和技术问题", "逻辑推理", "创意写作", "复杂分析",
-                    "学术研究", "产品设计", "策略规划", "代码审查",
-                    "系统架构设计", "技术文档编写"
-                ],
-                performance_profile={
-                    "reasoning": "excellent",      # 推理能力：卓越
-                    "creativity": "excellent",     # 创造力：卓越
-                    "coding": "excellent",         # 编程能力：卓越
-                    "factual": "good",             # 事实准确性：良好
-                    "speed": "medium",             # 响应速度：中等
-                    "context": "excellent"         # 上下文理解：卓越
-                },
-                special_features=["支持200K+长文本", "强逻辑推理链", "创意性强", "道德安全意识高"]
-            ),
 
-            "claude37_sonnet_new": ModelCapability(
-                name="claude37_sonnet_new",
-                provider="anthropic",
-                strengths=[
-                    "平衡的综合能力", "快速响应", "日常对话流畅",
-                    "信息整理清晰", "中等复杂度任务", "稳定性好"
-                ],
-                suitable_tasks=[
-                    "日常问答", "信息总结", "翻译", "简单分析",
-                    "文档整理", "基础编程", "通用任务", "客服对话",
-                    "内容润色", "快速原型开发"
-                ],
-                performance_profile={
-                    "reasoning": "good",
-                    "creativity": "good",
-                    "coding": "good",
-                    "factual": "good",
-                    "speed": "fast",
-                    "context": "good"
-                },
-                special_features=["响应快速", "稳定可靠", "平衡发展", "成本效益好"]
-            ),
+# 未知模型的描述模板
+_UNKNOWN_TMPL = "**{}**: 通用AI模型，具备基础的问答和分析能力"
+
+# 已知模型的描述文本（导入时预先生成）
+_MODEL_DESC_CACHE: Dict[str, str] = {
+    name: _format_desc(name, capability) for name, capability in _MODEL_KNOWLEDGE.items()
+}
+
+# 回退选择的优先级：综合能力 > 专精能力 > 轻量模型
+_PRIORITY_ORDER = (
+    # 顶级综合能力模型
+    "claude_sonnet4", "qwen3-max-preview", "gpt-41-0414-global",
+    # 代码专精模型
+    "qwen3-coder-480b-a35b-instruct",
+    # 优秀综合模型
+    "qwen-max", "openmatrix-qwen3-235b-inst-fp8",
+    # 平衡性能模型
+    "claude37_sonnet_new", "qwen-plus", "qwen3-coder-plus1",
+    # 多模态和创新模型
+    "glm-4.5",
+    # 快速轻量模型
+    "gpt-5-mini-0807-global", "gpt-41-mini-0414-global",
+    "qwen3-coder-plus",
+)
+
+# 回退选择结果中的静态部分（内部列表用元组，避免被调用方意外修改）
+_FALLBACK_TEMPLATE: Dict[str, Any] = {
+    'problem_analysis': {
+        'question_type': '通用问题',
+        'complexity_level': '中等',
+        'required_capabilities': ('综合分析', '准确回答'),
+        'key_challenges': ('信息整合', '逻辑推理')
+    },
+    'combination_strategy': '基于模型优先级的回退选择',
+    'confidence_level': '中',
+    'analysis_method': 'fallback'
+}
+_ROLES = ("主要", "辅助", "补充")
+_FALLBACK_REASONS = ('回退策略选择',)
+_FALLBACK_CONTRIBUTIONS = tuple(f'提供{role}观点' for role in _ROLES)
+
+
+# 模型选择分析提示：静态正文只解析一次，调用时仅替换问题与模型描述
+_ANALYSIS_PROMPT = string.Template("""
+你是一个专业的AI模型选择专家。请分析用户问题并从可用模型中推荐最适合的3个模型组合。
 
-            # ============= GPT 系列 =============
-            "gpt-41-0414-global": ModelCapability(
-                name="gpt-41-0414-global",
-                provider="openai",
-                strengths=[
-                    "数学和科学计算强", "逻辑推理严谨", "结构化分析精确",
-                    "代码优化能力", "技术文档处理", "多语言支持",
-                    "工具调用能力", "函数调用精准"
-                ],
-                suitable_tasks=[
-                    "数学问题", "科学计算", "算法设计", "数据分析",
-                    "技术文档", "系统设计", "工程问题", "API开发",
-                    "数据可视化", "统计分析"
-                ],
-                performance_profile={
-                    "reasoning": "excellent",
-                    "creativity": "good",
-                    "coding": "excellent",
-                    "factual": "excellent",
-                    "speed": "medium",
-                    "context": "excellent"
-                },
-                special_features=["数学能力强", "逻辑严谨", "技术导向", "128K上下文", "工具使用"]
-            ),
+用户问题：
+$question
 
-            "gpt-41-mini-0414-global": ModelCapability(
-                name="gpt-41-mini-0414-global",
-                provider="openai",
-                strengths=[
-                    "极速响应", "轻量级任务", "日常对话",
-                    "简单问答高效", "成本优化", "批量处理适合"
-                ],
-                suitable_tasks=[
-                    "快速问答", "简单翻译", "基础对话", "信息查找",
-                    "轻量级编程", "格式转换", "效率任务", "批量处理",
-                    "实时对话", "快速原型"
-                ],
-                performance_profile={
-                    "reasoning": "medium",
-                    "creativity": "medium",
-                    "coding": "good",
-                    "factual": "good",
-                    "speed": "very_fast",
-                    "context": "good"
-                },
-                special_features=["极速响应", "资源节约", "简洁高效", "性价比极高"]
-            ),
+可用模型及其能力：
+$model_descriptions
 
-            "gpt-5-mini-0807-global": ModelCapability(
-                name="gpt-5-mini-0807-global",
-                provider="openai",
-                strengths=[
-                    "新一代轻量模型", "速度与质量平衡", "改进的推理能力",
-                    "更好的指令遵循", "多任务处理", "成本效益优"
-                ],
-                suitable_tasks=[
-                    "通用问答", "文本生成", "简单编程", "信息提取",
-                    "对话系统", "内容审核", "分类任务", "摘要生成",
-                    "情感分析", "实体识别"
-                ],
-                performance_profile={
-                    "reasoning": "good",
-                    "creativity": "good",
-                    "coding": "good",
-                    "factual": "good",
-                    "speed": "very_fast",
-                    "context": "good"
-                },
-                special_features=["GPT-5系列", "速度快", "质量提升", "指令遵循好"]
-            ),
+请按以下步骤进行分析：
 
-            # ============= 通义千问系列 =============
-            "qwen-max": ModelCapability(
-                name="qwen-max",
-                provider="alibaba",
-                strengths=[
-                    "中文理解顶尖", "知识覆盖广", "多语言支持强",
-                    "文化语境理解深", "本土化内容精准", "推理能力强",
-                    "长文本处理", "专业领域知识"
-                ],
-                suitable_tasks=[
-                    "中文内容处理", "翻译任务", "文化相关问题",
-                    "本土化内容", "多语言对话", "知识问答",
-                    "专业文档", "学术研究", "商业分析"
-                ],
-                performance_profile={
-                    "reasoning": "excellent",
-                    "creativity": "good",
-                    "coding": "good",
-                    "factual": "excellent",
-                    "speed": "medium",
-                    "context": "excellent"
-                },
-                special_features=["中文优化", "知识丰富", "文化理解", "32K上下文"]
-            ),
+1. **问题分析**：分析问题的类型、复杂度、所需能力
+2. **需求匹配**：确定解决这个问题需要什么样的AI能力
+3. **模型评估**：评估每个模型在这个问题上的适合度
+4. **组合推荐**：选择3个最适合的模型，考虑能力互补
 
-            "qwen-plus": ModelCapability(
-                name="qwen-plus",
-                provider="alibaba",
-                strengths=[
-                    "中文处理优秀", "平衡性能好", "多领域知识",
-                    "实用性强", "性价比高", "响应稳定"
-                ],
-                suitable_tasks=[
-                    "中文问答", "通用任务", "知识整理",
-                    "实用工具", "日常助手", "信息处理",
-                    "内容生成", "文本分析"
-                ],
-                performance_profile={
-                    "reasoning": "good",
-                    "creativity": "good",
-                    "coding": "good",
-                    "factual": "good",
-                    "speed": "fast",
-                    "context": "good"
-                },
-                special_features=["中文友好", "实用导向", "性价比高", "稳定可靠"]
-            ),
+请严格按照以下JSON格式输出：
 
-            "qwen3-max-preview": ModelCapability(
-                name="qwen3-max-preview",
-                provider="alibaba",
-                strengths=[
-                    "第三代架构", "推理能力增强", "多模态理解",
-                    "代码能力提升", "知识更新", "长文本优化"
-                ],
-                suitable_tasks=[
-                    "复杂推理", "代码生成", "多模态分析",
-                    "长文档处理", "专业问答", "创新设计",
-                    "技术研究", "数据分析"
-                ],
-                performance_profile={
-                    "reasoning": "excellent",
-                    "creativity": "excellent",
-                    "coding": "excellent",
-                    "factual": "excellent",
-                    "speed": "medium",
-                    "context": "excellent"
-                },
-                special_features=["Qwen3架构", "多模态", "长文本", "最新技术"]
-            ),
+```json
+{
+    "problem_analysis": {
+        "question_type": "问题类型",
+        "complexity_level": "复杂度等级(简单/中等/复杂)",
+        "required_capabilities": ["所需能力1", "所需能力2", "所需能力3"],
+        "key_challenges": ["主要挑战1", "主要挑战2"]
+    },
+    "recommended_models": [
+        {
+            "model_name": "模型名称",
+            "rank": 1,
+            "suitability_score": 9.5,
+            "reasons": ["选择理由1", "选择理由2"],
+            "expected_contribution": "预期贡献"
+        },
+        {
+            "model_name": "模型名称", 
+            "rank": 2,
+            "suitability_score": 8.8,
+            "reasons": ["选择理由1", "选择理由2"],
+            "expected_contribution": "预期贡献"
+        },
+        {
+            "model_name": "模型名称",
+            "rank": 3, 
+            "suitability_score": 8.2,
+            "reasons": ["选择理由1", "选择理由2"],
+            "expected_contribution": "预期贡献"
+        }
+    ],
+    "combination_strategy": "组合策略说明",
+    "confidence_level": "高/中/低"
+}
+```
 
-            # ============= 智谱AI系列 =============
-            "glm-4.5": ModelCapability(
-                name="glm-4.5",
-                provider="zhipu",
-                strengths=[
-                    "多模态能力强", "视觉理解好", "综合分析能力",
-                    "创新性思维", "中文优化", "跨媒体处理"
-                ],
-                suitable_tasks=[
-                    "多模态任务", "创新设计", "综合分析",
-                    "图文理解", "跨领域问题", "创意项目",
-                    "视觉问答", "内容创作"
-                ],
-                performance_profile={
-                    "reasoning": "good",
-                    "creativity": "excellent",
-                    "coding": "good",
-                    "factual": "good",
-                    "speed": "medium",
-                    "context": "good"
-                },
-                special_features=["多模态", "创新思维", "综合能力", "中文优秀"]
-            ),
+注意：
+- 只从提供的可用模型中选择
+- 优先考虑能力互补的组合
+- 确保推荐的模型名称完全匹配可用模型列表
+- 适合度评分范围为0-10分
+""")
 
-            # ============= Qwen3-Coder系列 (代码专精) =============
-            "qwen3-coder-480b-a35b-instruct": ModelCapability(
-                name="qwen3-coder-480b-a35b-instruct",
-                provider="alibaba",
-                strengths=[
-                    "代码生成顶尖", "算法理解深", "多语言编程",
-                    "代码补全精准", "bug修复能力", "架构设计",
-                    "480B参数规模", "指令遵循好"
-                ],
-                suitable_tasks=[
-                    "代码生成", "算法实现", "代码审查", "bug修复",
-                    "重构优化", "技术文档", "API设计", "测试编写",
-                    "性能优化", "架构设计"
-                ],
-                performance_profile={
-                    "reasoning": "excellent",
-                    "creativity": "good",
-                    "coding": "outstanding",     # 编程能力：杰出
-                    "factual": "excellent",
-                    "speed": "medium",
-                    "context": "excellent"
-                },
-                special_features=["480B超大规模", "代码专精", "多语言", "指令遵循"]
-            ),
 
-            "qwen3-coder-plus1": ModelCapability(
-                name="qwen3-coder-plus1",
-                provider="alibaba",
-                strengths=[
-                    "代码生成优秀", "编程效率高", "多语言支持",
-                    "快速开发", "实用导向", "性价比好"
-                ],
-                suitable_tasks=[
-                    "快速开发", "代码补全", "简单重构", "脚本编写",
-                    "工具开发", "自动化任务", "原型开发", "代码转换"
-                ],
-                performance_profile={
-                    "reasoning": "good",
-                    "creativity": "medium",
-                    "coding": "excellent",
-                    "factual": "good",
-                    "speed": "fast",
-                    "context": "good"
-                },
-                special_features=["代码优化", "快速响应", "实用性强", "性价比高"]
-            ),
+class AIFusionSmartSelector:
+    """AI Fusion智能模型选择器"""
 
-            "qwen3-coder-plus": ModelCapability(
-                name="qwen3-coder-plus",
-                provider="alibaba",
-                strengths=[
-                    "代码能力强", "平衡性能", "多场景适用",
-                    "开发效率", "稳定可靠"
-                ],
-                suitable_tasks=[
-                    "通用编程", "代码生成", "技术问答", "开发辅助",
-                    "代码解释", "学习辅导", "代码优化"
-                ],
-                performance_profile={
-                    "reasoning": "good",
-                    "creativity": "medium",
-                    "coding": "excellent",
-                    "factual": "good",
-                    "speed": "fast",
-                    "context": "good"
-                },
-                special_features=["代码能力", "平衡发展", "稳定性好", "实用"]
-            ),
+    def __init__(self, registry=None):
+        self.analyzer_model = "claude_sonnet4"  # 用于分析的模型
+        self.model_knowledge = _MODEL_KNOWLEDGE
+        self.registry = registry  # ModelRegistry 实例
 
-            # ============= OpenMatrix系列 (开源生态) =============
-            "openmatrix-qwen3-235b-inst-fp8": ModelCapability(
-                name="openmatrix-qwen3-235b-inst-fp8",
-                provider="openmatrix",
-                strengths=[
-                    "超大规模235B", "指令遵循精准", "FP8优化",
-                    "推理效率高", "知识广博", "多任务能力"
-                ],
-                suitable_tasks=[
-                    "复杂推理", "专业问答", "深度分析", "知识整合",
-                    "多步骤任务", "系统设计", "研究辅助", "创新思考"
-                ],
-                performance_profile={
-                    "reasoning": "excellent",
-                    "creativity": "good",
-                    "coding": "good",
-                    "factual": "excellent",
-                    "speed": "medium",
-                    "context": "excellent"
-                },
-                special_features=["235B规模", "FP8量化", "开源生态", "高效推理"]
-            )
-        }
-    
     async def intelligent_model_selection(
         self,
         question: str,
@@ -436,10 +1203,13 @@ class AIFusionSmartSelector:
         Returns:
             选择结果包含推荐模型和分析理由
         """
-        print("🧠 正在进行智能模型分析...")
-        
+        logger.info("🧠 正在进行智能模型分析...")
+
+        # 可用模型按名称索引一次，供各辅助方法做 O(1) 查找
+        available_by_name = {m.name: m for m in available_models}
+
         # 1. 构建模型知识提示
-        model_descriptions = self._build_model_descriptions(available_models)
+        model_descriptions = self._build_model_descriptions(available_by_name)
         
         # 2. 创建分析提示
         analysis_prompt = self._create_analysis_prompt(question, model_descriptions)
@@ -460,128 +1230,51 @@ class AIFusionSmartSelector:
                 },
             )
             
-            # 4. 解析推荐结果
-            recommendation = self._parse_recommendation(response, available_models)
-            
-            return recommendation
-            
-        except Exception as e:
-            print(f"⚠️ 智能选择失败，使用回退策略: {str(e)}")
-            return self._fallback_selection(question, available_models)
-    
-    def _build_model_descriptions(self, available_models: List[ModelConfig]) -> str:
-        """构建可用模型的描述"""
-        descriptions = []
-        
-        for model in available_models:
-            model_name = model.name
-            if model_name in self.model_knowledge:
-                capability = self.model_knowledge[model_name]
-                
-                desc = f"""
-**{model_name}**:
-- 核心优势: {', '.join(capability.strengths)}
-- 适合任务: {', '.join(capability.suitable_tasks)}
-- 性能特点: 推理能力{capability.performance_profile['reasoning']}, 创造力{capability.performance_profile['creativity']}, 编程能力{capability.performance_profile['coding']}, 事实准确性{capability.performance_profile['factual']}, 响应速度{capability.performance_profile['speed']}
-- 特殊功能: {', '.join(capability.special_features)}
-"""
-                descriptions.append(desc)
-            else:
-                # 对于未知模型，提供基本信息
-                descriptions.append(f"**{model_name}**: 通用AI模型，具备基础的问答和分析能力")
-        
-        return "\n".join(descriptions)
-    
-    def _create_analysis_prompt(self, question: str, model_descriptions: str) -> str:
-        """创建分析提示"""
-        return f"""
-你是一个专业的AI模型选择专家。请分析用户问题并从可用模型中推荐最适合的3个模型组合。
-
-用户问题：
-{question}
-
-可用模型及其能力：
-{model_descriptions}
-
-请按以下步骤进行分析：
-
-1. **问题分析**：分析问题的类型、复杂度、所需能力
-2. **需求匹配**：确定解决这个问题需要什么样的AI能力
-3. **模型评估**：评估每个模型在这个问题上的适合度
-4. **组合推荐**：选择3个最适合的模型，考虑能力互补
-
-请严格按照以下JSON格式输出：
-
-```json
-{{
-    "problem_analysis": {{
-        "question_type": "问题类型",
-        "complexity_level": "复杂度等级(简单/中等/复杂)",
-        "required_capabilities": ["所需能力1", "所需能力2", "所需能力3"],
-        "key_challenges": ["主要挑战1", "主要挑战2"]
-    }},
-    "recommended_models": [
-        {{
-            "model_name": "模型名称",
-            "rank": 1,
-            "suitability_score": 9.5,
-            "reasons": ["选择理由1", "选择理由2"],
-            "expected_contribution": "预期贡献"
-        }},
-        {{
-            "model_name": "模型名称", 
-            "rank": 2,
-            "suitability_score": 8.8,
-            "reasons": ["选择理由1", "选择理由2"],
-            "expected_contribution": "预期贡献"
-        }},
-        {{
-            "model_name": "模型名称",
-            "rank": 3, 
-            "suitability_score": 8.2,
-            "reasons": ["选择理由1", "选择理由2"],
-            "expected_contribution": "预期贡献"
-        }}
-    ],
-    "combination_strategy": "组合策略说明",
-    "confidence_level": "高/中/低"
-}}
-```
+            # 4. 解析推荐结果
+            recommendation = self._parse_recommendation(response, available_by_name)
+            
+            return recommendation
+            
+        except Exception as e:
+            logger.warning("⚠️ 智能选择失败，使用回退策略: %s", e)
+            return self._fallback_selection(question, available_by_name)
+    
+    def _build_model_descriptions(self, available_by_name: Dict[str, ModelConfig]) -> str:
+        """构建可用模型的描述"""
+        return "\n".join(
+            _MODEL_DESC_CACHE.get(name) or _UNKNOWN_TMPL.format(name)
+            for name in available_by_name
+        )
 
-注意：
-- 只从提供的可用模型中选择
-- 优先考虑能力互补的组合
-- 确保推荐的模型名称完全匹配可用模型列表
-- 适合度评分范围为0-10分
-"""
+    def _create_analysis_prompt(self, question: str, model_descriptions: str) -> str:
+        """创建分析提示"""
+        return _ANALYSIS_PROMPT.substitute(question=question, model_descriptions=model_descriptions)
     
     def _parse_recommendation(
         self, 
         response: str, 
-        available_models: List[ModelConfig]
+        available_by_name: Dict[str, ModelConfig]
     ) -> Dict[str, Any]:
         """解析LLM推荐结果"""
         
         try:
             # 提取JSON部分
-            json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-            if json_match:
-                json_str = json_match.group(1)
-                recommendation = json.loads(json_str)
+            json_str = _extract_json_block(response)
+            if json_str is not None:
+                recommendation = _json_loads(json_str)
                 
                 # 验证推荐的模型是否在可用列表中
-                available_model_names = [m.name for m in available_models]
                 valid_models = []
                 
                 for rec_model in recommendation.get('recommended_models', []):
                     model_name = rec_model.get('model_name', '')
-                    if model_name in available_model_names:
+                    if model_name in available_by_name:
                         valid_models.append(rec_model)
                 
                 # 如果有效模型少于3个，用回退策略补充
                 if len(valid_models) < 3:
-                    print(f"⚠️ 智能推荐的模型数量不足({len(valid_models)})，使用回退策略补充")
-                    fallback = self._fallback_selection("", available_models)
+                    logger.warning("⚠️ 智能推荐的模型数量不足(%s)，使用回退策略补充", len(valid_models))
+                    fallback = self._fallback_selection("", available_by_name)
                     
                     # 补充模型
                     existing_names = [m['model_name'] for m in valid_models]
@@ -602,72 +1295,43 @@ class AIFusionSmartSelector:
                 return recommendation
                 
         except Exception as e:
-            print(f"⚠️ 解析推荐结果失败: {str(e)}")
+            logger.warning("⚠️ 解析推荐结果失败: %s", e)
         
         # 解析失败时使用回退策略
-        return self._fallback_selection("", available_models)
+        return self._fallback_selection("", available_by_name)
     
     def _fallback_selection(
         self,
         question: str,
-        available_models: List[ModelConfig]
+        available_by_name: Dict[str, ModelConfig]
     ) -> Dict[str, Any]:
         """回退选择策略 - 基于模型能力的优先级排序"""
 
-        # 优先级策略：综合能力 > 专精能力 > 轻量模型
-        priority_order = [
-            # 顶级综合能力模型
-            "claude_sonnet4", "qwen3-max-preview", "gpt-41-0414-global",
-            # 代码专精模型
-            "qwen3-coder-480b-a35b-instruct",
-            # 优秀综合模型
-            "qwen-max", "openmatrix-qwen3-235b-inst-fp8",
-            # 平衡性能模型
-            "claude37_sonnet_new", "qwen-plus", "qwen3-coder-plus1",
-            # 多模态和创新模型
-            "glm-4.5",
-            # 快速轻量模型
-            "gpt-5-mini-0807-global", "gpt-41-mini-0414-global",
-            "qwen3-coder-plus"
-        ]
-        
-        available_names = [m.name for m in available_models]
-        selected = []
-        
         # 按优先级选择
-        for model_name in priority_order:
-            if model_name in available_names and len(selected) < 3:
-                selected.append(model_name)
-        
+        selected = [name for name in _PRIORITY_ORDER if name in available_by_name][:3]
+
         # 如果不足3个，从剩余模型中选择
-        while len(selected) < 3 and len(selected) < len(available_names):
-            for model in available_models:
-                if model.name not in selected:
-                    selected.append(model.name)
-                    break
-        
-        return {
-            'problem_analysis': {
-                'question_type': '通用问题',
-                'complexity_level': '中等',
-                'required_capabilities': ['综合分析', '准确回答'],
-                'key_challenges': ['信息整合', '逻辑推理']
-            },
-            'recommended_models': [
-                {
-                    'model_name': model_name,
-                    'rank': i + 1,
-                    'suitability_score': 8.0 - i * 0.5,
-                    'reasons': ['回退策略选择'],
-                    'expected_contribution': f'提供{["主要", "辅助", "补充"][i]}观点'
-                }
-                for i, model_name in enumerate(selected[:3])
-            ],
-            'selected_models': selected[:3],
-            'combination_strategy': '基于模型优先级的回退选择',
-            'confidence_level': '中',
-            'analysis_method': 'fallback'
-        }
+        if len(selected) < 3:
+            for name in available_by_name:
+                if name not in selected:
+                    selected.append(name)
+                    if len(selected) == 3:
+                        break
+
+        selected = selected[:3]
+        result = {**_FALLBACK_TEMPLATE}
+        result['selected_models'] = selected
+        result['recommended_models'] = [
+            {
+                'model_name': model_name,
+                'rank': i + 1,
+                'suitability_score': 8.0 - i * 0.5,
+                'reasons': _FALLBACK_REASONS,
+                'expected_contribution': _FALLBACK_CONTRIBUTIONS[i]
+            }
+            for i, model_name in enumerate(selected)
+        ]
+        return result
 
 
 import re
@@ -675,13 +1339,157 @@ import asyncio
 from typing import List, Dict, Any, Optional
 from dataclasses import dataclass
 # Imports handled in header
-import hashlib
 import json
 
 
-@dataclass
+
+# 评估提示版本：修改批量/单项评估提示或评分解析逻辑时递增，使旧的评估缓存失效
+_EVAL_PROMPT_VERSION = "4"
+
+# 批量评估提示：评分说明作为固定的 system 前缀（便于服务端提示缓存命中），
+# 回答与问题放在之后的 user 消息中
+_BATCH_EVAL_FOOTER = string.Template("""
+**问题：**
+$question
+
+请按照系统提示中的评分任务和输出格式，对以上$count个回答完成评估。
+""")
+
+_SINGLE_EVAL_SYSTEM_PROMPT = """你是一位严格的内容质量评估专家，负责对AI模型的回答进行客观、准确、有区分度的评分。
+
+## 评分要求
+
+请从以下5个维度对回答进行评分（0-10分，保留一位小数）：
+
+1. **完整性(Completeness)**: 回答是否完整地覆盖了问题的各个方面
+2. **准确性(Accuracy)**: 回答中的信息、概念、示例是否准确可靠
+3. **清晰度(Clarity)**: 回答的表达是否清晰、逻辑是否连贯、易于理解
+4. **相关性(Relevance)**: 回答是否紧扣问题主题，没有离题或冗余内容
+5. **综合质量(Overall)**: 整体回答质量（必须是前4个维度的平均值±0.5分）
+
+## 评分标准（严格执行）
+
+**使用相对评分而非绝对评分：**
+- 9.0-10.0分: 卓越表现，超越预期，几乎无瑕疵
+- 7.5-8.9分: 优秀表现，质量很高但有小的改进空间
+- 6.0-7.4分: 良好表现，基本满足需求但有明显不足
+- 4.5-5.9分: 及格表现，能回答问题但质量一般
+- 3.0-4.4分: 较差表现，存在明显问题和遗漏
+- 0.0-2.9分: 不合格，严重错误或完全未回答
+
+**禁止评分行为：**
+- ❌ 禁止给所有维度都打8-10分的高分
+- ❌ 禁止不同回答获得完全相同的评分
+- ❌ 禁止给出模糊的评分理由
+
+**必须执行：**
+- ✅ 必须引用回答中的具体内容片段作为评分依据
+- ✅ 必须明确指出至少2个优点和2个不足
+- ✅ 必须基于实际内容质量给分，不受回答长度影响
+- ✅ 综合评分必须接近前4个维度的平均值
+
+## 输出格式（严格遵守）
+
+完整性评分: X.X
+准确性评分: X.X
+清晰度评分: X.X
+相关性评分: X.X
+综合评分: X.X
+
+**评分依据（必填）：**
+
+【完整性】
+✅ 优点: [引用具体内容片段，说明哪些方面做得好]
+❌ 不足: [引用具体内容片段或指出缺失的内容]
+
+【准确性】
+✅ 优点: [引用准确的内容示例]
+❌ 不足: [指出不准确、误导或有争议的内容]
+
+【清晰度】
+✅ 优点: [说明表达清晰的部分]
+❌ 不足: [指出表达不清或逻辑混乱的部分]
+
+【相关性】
+✅ 优点: [说明紧扣主题的部分]
+❌ 不足: [指出离题、冗余或不够聚焦的内容]
+
+**独特特征：**
+[说明这个回答与其他典型回答相比的独特之处，至少50字]
+
+**核心建议：**
+[给出3个具体的改进建议]
+"""
+
+# 批量/合批评估共用的 JSON 输出格式
+_EVAL_JSON_FORMAT = """**输出格式（严格遵守，只输出JSON数组）：**
+
+```json
+[
+    {
+        "index": 1,
+        "source": "源名称",
+        "completeness": 7.5,
+        "accuracy": 8.0,
+        "clarity": 7.0,
+        "relevance": 8.0,
+        "overall": 7.6,
+        "feedback": {
+            "completeness": {"strengths": ["优点"], "weaknesses": ["不足"]},
+            "accuracy": {"strengths": ["优点"], "weaknesses": ["不足"]},
+            "clarity": {"strengths": ["优点"], "weaknesses": ["不足"]},
+            "relevance": {"strengths": ["优点"], "weaknesses": ["不足"]}
+        },
+        "unique_characteristics": "与其他回答相比的独特之处",
+        "core_suggestions": ["改进建议1", "改进建议2", "改进建议3"]
+    }
+]
+```
+"""
+
+_BATCH_EVAL_SYSTEM_PROMPT = """你是一位严格的质量评估专家。你将看到多个AI模型对同一问题给出的回答，请一次性完成对比评分和各维度评分。
+
+**评分任务：**
+
+请从以下5个维度对每个回答评分（0-10分，保留一位小数）：
+1. **完整性(completeness)**: 是否完整覆盖问题的各个方面
+2. **准确性(accuracy)**: 信息、概念、示例是否准确可靠
+3. **清晰度(clarity)**: 表达是否清晰、逻辑是否连贯
+4. **相关性(relevance)**: 是否紧扣问题主题，没有离题或冗余
+5. **综合质量(overall)**: 相对其他回答的整体质量
+
+**评分要求：**
+- 必须拉开评分差距：最高和最低的综合分差距至少1.5分
+- 参考区间：最优秀 7.5-9.0，中等 6.0-7.5，较差 4.5-6.0
+- 综合分必须接近前4个维度的平均值（±0.5分）
+- 优点和不足必须引用回答中的具体内容，不受回答长度影响
+
+""" + _EVAL_JSON_FORMAT
+
+# 动态合批评估：条目来自不同请求、各自对应不同问题，只做独立评分不做对比
+_MERGED_EVAL_SYSTEM_PROMPT = """你是一位严格的内容质量评估专家。你将看到若干个相互独立的条目，每个条目包含一个问题和一个AI模型的回答，请分别对每个回答评分。
+
+**评分任务：**
+
+请从以下5个维度对每个回答评分（0-10分，保留一位小数）：
+1. **完整性(completeness)**: 是否完整覆盖问题的各个方面
+2. **准确性(accuracy)**: 信息、概念、示例是否准确可靠
+3. **清晰度(clarity)**: 表达是否清晰、逻辑是否连贯
+4. **相关性(relevance)**: 是否紧扣问题主题，没有离题或冗余
+5. **综合质量(overall)**: 整体回答质量
+
+**评分要求：**
+- 各条目相互独立，只依据该条目自己的问题评分，不要在条目之间比较
+- 综合分必须接近前4个维度的平均值（±0.5分）
+- 优点和不足必须引用回答中的具体内容，不受回答长度影响
+- "index" 填写条目编号，"source" 填写条目标题中的名称
+
+""" + _EVAL_JSON_FORMAT
+
+
+@dataclass(slots=True)
 class QualityMetrics:
-    """质量评估指标"""
+    """质量评估指标（使用 __slots__，每个来源一份，省去实例 __dict__）"""
     completeness_score: float  # 完整性评分 (0-10)
     accuracy_score: float      # 准确性评分 (0-10)
     clarity_score: float       # 清晰度评分 (0-10)
@@ -694,6 +1502,130 @@ class QualityMetrics:
     information_density: float # 信息密度 (0-10)
 
 
+# LLM 评分维度，与 QualityMetrics 中的 *_score 字段一一对应
+_SCORE_DIMENSIONS = ('completeness', 'accuracy', 'clarity', 'relevance', 'overall')
+_SCORE_GETTERS = {dimension: attrgetter(f'{dimension}_score') for dimension in _SCORE_DIMENSIONS}
+# 不含综合评分的四个核心维度
+_CORE_DIMENSIONS = ('completeness', 'accuracy', 'clarity', 'relevance')
+
+# 融合提升显著性分档（相对单模型均值的提升量，升序阈值与对应标签）
+_SIGNIFICANCE_THRESHOLDS = (-0.5, -0.2, 0.2, 0.5, 1.0)
+_SIGNIFICANCE_LABELS = ("明显下降", "轻微下降", "基本持平", "轻微提升", "明显提升", "显著提升")
+# 融合价值：综合质量提升量 -> 质量提升价值分（严格大于阈值）
+_QUALITY_VALUE_THRESHOLDS = (0, 0.2, 0.5, 1.0)
+_QUALITY_VALUE_POINTS = (0, 10, 20, 30, 40)
+# 融合价值：综合得分相对最佳单模型的差值 -> 一致性价值分（小于阈值扣分）
+_CONSISTENCY_VALUE_THRESHOLDS = (-0.5, 0)
+_CONSISTENCY_VALUE_POINTS = (0, 10, 15)
+# 融合价值总分 -> 价值等级（大于等于阈值）
+_VALUE_LEVEL_THRESHOLDS = (20, 40, 60, 80)
+_VALUE_LEVEL_LABELS = ("很差", "较差", "一般", "良好", "优秀")
+# 速度-质量权衡分析中每个模型的字段（all_models_data 按这些字段分列存储）
+_TRADEOFF_FIELDS = (
+    'model_name', 'response_time', 'quality_score',
+    'completeness', 'accuracy', 'clarity', 'relevance', 'efficiency_score'
+)
+# 场景化推荐模板，按速度-质量权衡中的单个模型行数据（_TRADEOFF_FIELDS）填充
+_TIME_CRITICAL_TEMPLATE = "推荐使用 {model_name} (响应时间: {response_time:.2f}秒, 质量: {quality_score:.1f}/10)"
+_QUALITY_CRITICAL_TEMPLATE = "推荐使用 {model_name} (质量: {quality_score:.1f}/10, 响应时间: {response_time:.2f}秒)"
+_BALANCED_TEMPLATE = (
+    "推荐使用 {model_name} (效率得分: {efficiency_score:.2f}, "
+    "质量: {quality_score:.1f}/10, 响应时间: {response_time:.2f}秒)"
+)
+# 融合效果等级：按顺序匹配 (条件(总分, 综合提升), 等级, 图标)，都不满足时为“需改进”
+_EFFECTIVENESS_LEVELS = (
+    (lambda score, imp: score >= 80 and imp > 0.5, "卓越", "🌟"),
+    (lambda score, imp: score >= 60 and imp > 0.2, "优秀", "⭐"),
+    (lambda score, imp: score >= 40 and imp >= 0, "良好", "✅"),
+    (lambda score, imp: score >= 20, "一般", "⚠️"),
+)
+# 融合改进建议规则：(条件(整合效果, 融合价值), 建议)，按顺序逐条判断
+_EFFECTIVENESS_RULES = (
+    (lambda ie, fv: ie['new_content_added'] == 0, "融合回答未添加新内容，建议在融合时增加综合性见解"),
+    (lambda ie, fv: ie['fusion_uniqueness'] < 10, "融合回答独特性较低，建议增加独特的综合性分析"),
+    (lambda ie, fv: not ie['structure_improved'], "可以进一步优化回答的结构组织，提高可读性"),
+    (lambda ie, fv: fv['quality_value'] < 20, "整体质量提升有限，建议优化融合算法或模型选择"),
+    (lambda ie, fv: fv['integration_value'] < 15, "内容整合价值较低，建议更好地融合各模型的优势观点"),
+)
+# 评分维度的中文名称
+_DIMENSION_LABELS = {
+    'completeness': '完整性',
+    'accuracy': '准确性',
+    'clarity': '清晰度',
+    'relevance': '相关性'
+}
+
+
+def _metrics_to_columns(
+    evaluations: Dict[str, QualityMetrics]
+) -> Tuple[List[str], Dict[str, List[float]]]:
+    """将 {来源: QualityMetrics} 转为列式布局：来源名列表 + 每个维度一列评分"""
+    names = list(evaluations)
+    metrics = list(evaluations.values())
+    columns = {
+        dimension: list(map(getter, metrics)) for dimension, getter in _SCORE_GETTERS.items()
+    }
+    return names, columns
+
+
+# 个体分析的固定文案：性能亮点（维度, 唯一最高, 并列最高）与改进/优势描述
+_PERFORMANCE_HIGHLIGHTS = (
+    ('completeness', "完整性最佳", "完整性优秀(并列第1)"),
+    ('accuracy', "准确性最高", "准确性优秀(并列第1)"),
+    ('clarity', "表达最清晰", "清晰度优秀(并列第1)"),
+    ('relevance', "相关性最强", "相关性优秀(并列第1)"),
+)
+_IMPROVEMENT_SUGGESTIONS = {
+    '完整性': '可增加回答的全面性和深度',
+    '准确性': '需要提高信息的准确性和可靠性',
+    '清晰度': '表达可以更加清晰明了',
+    '相关性': '需要更好地理解和对针问题核心'
+}
+_EXCELLENCE_DESCRIPTIONS = {
+    '完整性': '在内容完整性方面表现突出，可作为核心竞争力',
+    '准确性': '信息准确性是该模型的最大亮点',
+    '清晰度': '表达清晰度优秀，适合复杂问题解释',
+    '相关性': '对问题的理解和对针性是显著优势'
+}
+# 模型特异性描述模板（按模型名），{m} 为该模型的 QualityMetrics
+_MODEL_TRAIT_TEMPLATES = {
+    'claude_sonnet4': "逻辑推理能力在本次任务中评分为{m.clarity_score:.1f}",
+    'gpt-41-0414-global': "数学和逻辑分析能力在本次表现为{m.accuracy_score:.1f}分",
+    'qwen-max': "中文理解和处理能力在本次任务中表现为{m.relevance_score:.1f}分",
+    'claude37_sonnet_new': "平衡性表现，本次综合评分{m.overall_score:.1f}",
+    'qwen-plus': "性价比较高，本次任务中效率表现良好",
+    'gpt-41-mini-0414-global': "快速响应特性，适合轻量级任务",
+}
+
+
+@dataclass(slots=True)
+class _ScoreTable:
+    """单模型评分（不含融合回答）的列式汇总，一次分析内各对比步骤共用，避免重复统计与排序"""
+    names: List[str]
+    columns: Dict[str, List[float]]
+    avg: Dict[str, float]
+    max: Dict[str, float]
+    max_counts: Dict[str, int]             # 每个维度达到最高分的模型数
+    ranks: Dict[str, Dict[str, int]]       # 维度 -> {来源: 名次}，同分时保持原有顺序
+
+    @classmethod
+    def build(cls, evaluations: Dict[str, QualityMetrics]) -> "_ScoreTable":
+        names, columns = _metrics_to_columns(evaluations)
+        if not names:
+            return cls(names, columns, {}, {}, {}, {})
+
+        avg = {dimension: sum(column) / len(column) for dimension, column in columns.items()}
+        max_scores = {dimension: max(column) for dimension, column in columns.items()}
+        max_counts = {
+            dimension: column.count(max_scores[dimension]) for dimension, column in columns.items()
+        }
+        ranks: Dict[str, Dict[str, int]] = {}
+        for dimension, column in columns.items():
+            order = sorted(range(len(names)), key=column.__getitem__, reverse=True)
+            ranks[dimension] = {names[i]: rank for rank, i in enumerate(order, 1)}
+        return cls(names, columns, avg, max_scores, max_counts, ranks)
+
+
 class AIFusionQualityAnalyzer:
     """AI Fusion质量分析器"""
 
@@ -706,10 +1638,12 @@ class AIFusionQualityAnalyzer:
             "qwen-max"
         ]
         self.registry = registry  # ModelRegistry 实例
-        self._current_trace_id: Optional[str] = None
-        self._current_parent_observation_id: Optional[str] = None
         self._resolved_evaluator_model: Optional[str] = None
-        self._evaluation_cache: Dict[str, Dict[str, Tuple[QualityMetrics, Dict[str, Any]]]] = {}
+        # 评估结果缓存：键为 (评估模型, 问题, 来源, 回答, 提示版本) 指纹，LRU 淘汰
+        self._evaluation_cache: "OrderedDict[int, Tuple[QualityMetrics, Dict[str, Any]]]" = OrderedDict()
+        self.evaluation_cache_size = 1024
+        self.cache_stats = {"hits": 0, "misses": 0}
+        self.batch_eval_token_budget = 12000  # 批量评估提示 token 上限，超出时拆成两批
     
     async def analyze_quality(
         self,
@@ -730,75 +1664,107 @@ class AIFusionQualityAnalyzer:
         Returns:
             质量分析结果
         """
-        print("🔍 开始质量分析...")
+        logger.info("🔍 开始质量分析...")
 
-        self._current_trace_id = trace_id
-        self._current_parent_observation_id = parent_observation_id
-        await self._ensure_evaluator_model()
+        from langfuse_tracer import create_span, finish_observation
 
-        try:
-            # 1. 计算基础指标
-            basic_metrics = {}
-            for response in llm_responses:
-                if response['success']:
-                    basic_metrics[response['model_name']] = self._calculate_basic_metrics(
-                        response['response']
-                    )
+        # 整个质量分析只开一个 span，内部各次 LLM 调用挂在它下面
+        analysis_span = create_span(
+            trace_id,
+            name="quality_analysis",
+            parent_observation_id=parent_observation_id,
+            input_data={"question": question, "n_models": len(llm_responses)},
+            metadata={"component": "quality_analyzer"},
+        )
 
-            # 融合回答的基础指标
-            basic_metrics['fusion_answer'] = self._calculate_basic_metrics(fusion_answer)
+        # 通过 contextvar 传递追踪上下文，子任务中的 call_llm_async 会自动继承
+        analysis_parent_id = analysis_span.id if analysis_span else parent_observation_id
+        with trace_scope(trace_id, analysis_parent_id):
+            try:
+                await self._ensure_evaluator_model()
 
-            # 2. LLM评估（异步并发）
-            llm_evaluations, evaluation_details = await self._evaluate_with_llm(
-                question, llm_responses, fusion_answer
-            )
+                # 1-3. 基础指标（纯计算，放到线程中）与 LLM 评估、内容语义分析（网络请求）并发进行
+                basic_metrics, (llm_evaluations, evaluation_details), content_analysis = await asyncio.gather(
+                    asyncio.to_thread(self._compute_all_basic_metrics, llm_responses, fusion_answer),
+                    self._evaluate_with_llm(question, llm_responses, fusion_answer),
+                    self._perform_content_semantic_analysis(question, llm_responses, fusion_answer)
+                )
 
-            # 3. 内容语义分析（增强差异化能力）
-            content_analysis = await self._perform_content_semantic_analysis(
-                question, llm_responses, fusion_answer
-            )
+                # 单模型评分的列式汇总只构建一次，供对比分析与融合效果分析共用
+                score_table = _ScoreTable.build(
+                    {k: v for k, v in llm_evaluations.items() if k != 'fusion_answer'}
+                )
 
-            # 4. 对比分析（增强）
-            comparison_analysis = self._perform_enhanced_comparison_analysis(
-                basic_metrics, llm_evaluations, content_analysis
-            )
+                # 4. 对比分析（增强）
+                comparison_analysis = self._perform_enhanced_comparison_analysis(
+                    basic_metrics, llm_evaluations, content_analysis, score_table
+                )
 
-            # 5. 逻辑一致性验证
-            consistency_check = self._perform_consistency_validation(
-                llm_evaluations, comparison_analysis, content_analysis
-            )
+                # 5. 逻辑一致性验证
+                consistency_check = self._perform_consistency_validation(
+                    llm_evaluations, comparison_analysis, content_analysis
+                )
 
-            # 6. 质量排名（经过一致性校正）
-            quality_ranking = self._calculate_validated_quality_ranking(
-                basic_metrics, llm_evaluations, consistency_check
-            )
+                # 6. 质量排名（经过一致性校正）
+                quality_ranking = self._calculate_validated_quality_ranking(
+                    basic_metrics, llm_evaluations, consistency_check
+                )
 
-            # 7. 融合效果量化分析（新增）
-            fusion_effectiveness = self._analyze_fusion_effectiveness(
-                llm_evaluations, comparison_analysis, content_analysis
-            )
+                # 7. 融合效果量化分析（新增）
+                fusion_effectiveness = self._analyze_fusion_effectiveness(
+                    llm_evaluations, comparison_analysis, content_analysis, score_table
+                )
 
-            # 8. 速度-质量权衡分析（新增）
-            speed_quality_tradeoff = self._analyze_speed_quality_tradeoff(
-                llm_responses, llm_evaluations
-            )
+                # 8. 速度-质量权衡分析（新增）
+                speed_quality_tradeoff = self._analyze_speed_quality_tradeoff(
+                    llm_responses, llm_evaluations
+                )
 
-            return {
-                'basic_metrics': basic_metrics,
-                'llm_evaluations': llm_evaluations,
-                'llm_evaluation_details': evaluation_details,
-                'content_analysis': content_analysis,
-                'comparison_analysis': comparison_analysis,
-                'consistency_check': consistency_check,
-                'quality_ranking': quality_ranking,
-                'fusion_effectiveness': fusion_effectiveness,  # 新增融合效果分析
-                'speed_quality_tradeoff': speed_quality_tradeoff  # 新增速度质量权衡分析
-            }
-        finally:
-            # 清理上下文
-            self._current_trace_id = None
-            self._current_parent_observation_id = None
+                quality_analysis = {
+                    'basic_metrics': basic_metrics,
+                    'llm_evaluations': llm_evaluations,
+                    'llm_evaluation_details': evaluation_details,
+                    'content_analysis': content_analysis,
+                    'comparison_analysis': comparison_analysis,
+                    'consistency_check': consistency_check,
+                    'quality_ranking': quality_ranking,
+                    'fusion_effectiveness': fusion_effectiveness,  # 新增融合效果分析
+                    'speed_quality_tradeoff': speed_quality_tradeoff  # 新增速度质量权衡分析
+                }
+
+                finish_observation(
+                    analysis_span,
+                    output_data={"quality_analysis": quality_analysis},
+                    metadata={"component": "quality_analyzer"},
+                )
+                return quality_analysis
+            except Exception as exc:
+                finish_observation(
+                    analysis_span,
+                    output_data={"error": str(exc)},
+                    metadata={"component": "quality_analyzer"},
+                    level="ERROR",
+                    status_message=str(exc),
+                )
+                raise
     
+    def _compute_all_basic_metrics(
+        self,
+        llm_responses: List[Dict],
+        fusion_answer: str
+    ) -> Dict[str, QualityMetrics]:
+        """计算所有成功回答及融合回答的基础指标"""
+        basic_metrics = {}
+        for response in llm_responses:
+            if response['success']:
+                basic_metrics[response['model_name']] = self._calculate_basic_metrics(
+                    response['response']
+                )
+
+        # 融合回答的基础指标
+        basic_metrics['fusion_answer'] = self._calculate_basic_metrics(fusion_answer)
+        return basic_metrics
+
     def _extract_text_statistics(self, text: str) -> Dict[str, Any]:
         """提取文本统计信息，兼顾中英文场景"""
         content = text.strip()
@@ -811,21 +1777,10 @@ class AIFusionQualityAnalyzer:
                 "information_density": 0.0
             }
 
-        char_count = len(content)
-
-        # 句子拆分：处理中英文标点
-        sentence_splits = re.split(r'[。！？!?]+|(?<=[.!?])\s+', content)
-        sentences = [s.strip() for s in sentence_splits if s and s.strip()]
-        sentence_count = len(sentences) or 1
-
-        # 词语抽取：单字中文 + 英文/数字词
-        token_pattern = re.compile(r'[\u4e00-\u9fff]|[A-Za-z]+(?:\'[A-Za-z]+)?|[0-9]+')
-        tokens = token_pattern.findall(content)
-        word_count = len(tokens)
-        unique_tokens = len({token.lower() for token in tokens}) if tokens else 0
+        char_count, word_count, sentence_count, unique_tokens, token_chars = _count_stats(content)
 
         avg_sentence_len = word_count / sentence_count if sentence_count else 0.0
-        avg_word_len = (sum(len(token) for token in tokens) / word_count) if word_count else 0.0
+        avg_word_len = (token_chars / word_count) if word_count else 0.0
 
         # 可读性：句长、词长越大可读性越低
         readability = 10.0
@@ -852,9 +1807,15 @@ class AIFusionQualityAnalyzer:
             "information_density": information_density
         }
 
-    def _build_comparison_excerpt(self, text: str, max_chars: int = 420) -> Tuple[str, Dict[str, Any]]:
-        """生成对比评分使用的摘要片段，同时返回基础统计信息"""
-        stats = self._extract_text_statistics(text)
+    def _build_comparison_excerpt(
+        self,
+        text: str,
+        max_chars: int = 420,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, Dict[str, Any]]:
+        """生成对比评分使用的摘要片段，同时返回基础统计信息（可传入已计算的统计）"""
+        if stats is None:
+            stats = self._extract_text_statistics(text)
         total_chars = stats["char_count"]
 
         if total_chars <= max_chars:
@@ -893,7 +1854,7 @@ class AIFusionQualityAnalyzer:
         llm_responses: List[Dict],
         fusion_answer: str
     ) -> Tuple[Dict[str, QualityMetrics], Dict[str, Dict[str, Any]]]:
-        """使用LLM评估回答质量（采用对比评分机制）"""
+        """使用LLM评估回答质量（对比评分与维度评分合并为一次批量调用）"""
 
         # 准备评估任务
         answer_sources = {}
@@ -904,335 +1865,426 @@ class AIFusionQualityAnalyzer:
 
         answer_sources['fusion_answer'] = fusion_answer
 
-        comparative_scores = await self._comparative_batch_evaluation(
-            question, answer_sources
-        )
-
         llm_evaluations: Dict[str, QualityMetrics] = {}
         evaluation_details: Dict[str, Dict[str, Any]] = {}
 
-        evaluation_tasks = []
-        pending_sources: List[str] = []
-        pending_hashes: Dict[str, str] = {}
+        pending_sources: Dict[str, str] = {}
+        pending_hashes: Dict[str, int] = {}
+        cache_keys: Dict[str, int] = {}
+        evaluator_model = await self._ensure_evaluator_model()
 
         for source_name, answer_text in answer_sources.items():
-            base_score = comparative_scores.get(source_name, 7.0)
-            answer_hash = hashlib.sha256(answer_text.encode('utf-8')).hexdigest()
-            cache_bucket = self._evaluation_cache.setdefault(source_name, {})
-
-            if answer_hash in cache_bucket:
-                cached_metrics, cached_details = cache_bucket[answer_hash]
-                llm_evaluations[source_name] = cached_metrics
-                evaluation_details[source_name] = cached_details
+            cache_key = _fast_key(
+                evaluator_model, question, source_name, answer_text, _EVAL_PROMPT_VERSION
+            )
+            cache_keys[source_name] = cache_key
+            cached = self._evaluation_cache.get(cache_key)
+
+            if cached is not None:
+                self._evaluation_cache.move_to_end(cache_key)
+                self.cache_stats["hits"] += 1
+                llm_evaluations[source_name], evaluation_details[source_name] = cached
             else:
-                evaluation_tasks.append(
-                    self._evaluate_single_answer(
-                        question,
-                        answer_text,
-                        source_name,
-                        base_reference_score=base_score
-                    )
-                )
-                pending_sources.append(source_name)
-                pending_hashes[source_name] = answer_hash
-
-        if evaluation_tasks:
-            evaluation_results = await asyncio.gather(*evaluation_tasks, return_exceptions=True)
-
-            for i, source_name in enumerate(pending_sources):
-                if i < len(evaluation_results) and not isinstance(evaluation_results[i], Exception):
-                    metrics, details = evaluation_results[i]
-                    llm_evaluations[source_name] = metrics
-                    evaluation_details[source_name] = details
-                    cached = self._evaluation_cache.setdefault(source_name, {})
-                    cached[pending_hashes[source_name]] = (metrics, details)
-                else:
-                    print(f"⚠️ {source_name} 评估失败，使用默认值")
-                    default_metrics = QualityMetrics(5, 5, 5, 5, 5, 0, 0, 0, 5, 5)
-                    default_details = self._default_evaluation_details()
-                    llm_evaluations[source_name] = default_metrics
-                    evaluation_details[source_name] = default_details
-                    cached = self._evaluation_cache.setdefault(source_name, {})
-                    cached[pending_hashes[source_name]] = (default_metrics, default_details)
+                self.cache_stats["misses"] += 1
+                pending_sources[source_name] = answer_text
+                pending_hashes[source_name] = _fast_key(answer_text)
+
+        if not pending_sources:
+            return llm_evaluations, evaluation_details
+
+        # 完全相同的回答只评估一次，结果再广播给同组的其它来源
+        duplicate_groups: Dict[int, List[str]] = {}
+        for source_name in pending_sources:
+            duplicate_groups.setdefault(pending_hashes[source_name], []).append(source_name)
+        unique_sources = {
+            members[0]: pending_sources[members[0]] for members in duplicate_groups.values()
+        }
+        if len(unique_sources) < len(pending_sources):
+            logger.info("♻️ 检测到重复回答，仅评估 %s/%s 个", len(unique_sources), len(pending_sources))
+
+        # 只有一个待评估回答时没有对比对象，跳过对比式批量评估，直接单独评估
+        if len(unique_sources) > 1:
+            batch_results = await self._batch_detailed_evaluation(question, unique_sources)
+        else:
+            batch_results = {}
+
+        # 仅对批量结果中解析失败的回答逐个回退评估
+        fallback_sources = [name for name in unique_sources if name not in batch_results]
+        if fallback_sources:
+            if len(unique_sources) > 1:
+                logger.warning("⚠️ 批量评估未覆盖 %s，逐个回退评估", ', '.join(fallback_sources))
+            fallback_results = await asyncio.gather(
+                *[
+                    self._evaluate_single_answer(question, unique_sources[name], name)
+                    for name in fallback_sources
+                ],
+                return_exceptions=True
+            )
+            for source_name, result in zip(fallback_sources, fallback_results):
+                if not isinstance(result, Exception):
+                    batch_results[source_name] = result
+
+        for members in duplicate_groups.values():
+            representative = members[0]
+            if representative in batch_results:
+                for member in members[1:]:
+                    batch_results[member] = batch_results[representative]
+
+        for source_name in pending_sources:
+            if source_name not in batch_results:
+                # 失败结果不写入缓存，下次请求会重新评估
+                logger.warning("⚠️ %s 评估失败，使用默认值", source_name)
+                llm_evaluations[source_name] = QualityMetrics(5, 5, 5, 5, 5, 0, 0, 0, 5, 5)
+                evaluation_details[source_name] = self._default_evaluation_details()
+                continue
+
+            metrics, details = batch_results[source_name]
+            llm_evaluations[source_name] = metrics
+            evaluation_details[source_name] = details
+            self._evaluation_cache[cache_keys[source_name]] = (metrics, details)
+            if len(self._evaluation_cache) > self.evaluation_cache_size:
+                self._evaluation_cache.popitem(last=False)
 
         return llm_evaluations, evaluation_details
 
-    async def _comparative_batch_evaluation(
+    async def _batch_detailed_evaluation(
         self,
         question: str,
         answer_sources: Dict[str, str]
-    ) -> Dict[str, float]:
+    ) -> Dict[str, Tuple[QualityMetrics, Dict[str, Any]]]:
         """
-        批量对比评分：一次性评估所有回答，给出相对评分
-        这能确保评分的区分度和一致性
+        批量详细评估：一次调用同时完成对比评分和各维度评分
+        提示过长时拆成两批并发调用，但不会退化为逐个调用
         """
-        print("🔍 正在进行批量对比评分...")
-        evaluator_model = await self._ensure_evaluator_model()
-
-        # 构建对比评分prompt
-        comparative_prompt = f"""
-你是一位严格的质量评估专家。现在有{len(answer_sources)}个AI模型对同一问题给出了回答。
-
-**问题：**
-{question}
+        logger.info("🔍 正在进行批量对比评估...")
 
-**各模型回答：**
-"""
+        source_names = list(answer_sources.keys())
+        source_stats = {
+            name: self._extract_text_statistics(text) for name, text in answer_sources.items()
+        }
+        prompt = self._build_batch_evaluation_prompt(question, answer_sources, source_stats)
 
-        for i, (source_name, answer_text) in enumerate(answer_sources.items(), 1):
-            excerpt, stats = self._build_comparison_excerpt(answer_text)
-            comparative_prompt += f"""
-【回答{i}: {source_name} | 长度 {stats['char_count']} 字符，句数 {stats['sentence_count']}】
-{excerpt}
+        evaluator_model = await self._ensure_evaluator_model()
+        prompt_tokens = _count_tokens(_BATCH_EVAL_SYSTEM_PROMPT + prompt, evaluator_model)
+
+        if prompt_tokens > self.batch_eval_token_budget and len(source_names) > 1:
+            middle = (len(source_names) + 1) // 2
+            groups = [source_names[:middle], source_names[middle:]]
+            responses = await asyncio.gather(
+                *[
+                    self._call_batch_evaluator(
+                        self._build_batch_evaluation_prompt(
+                            question, {name: answer_sources[name] for name in group}, source_stats
+                        )
+                    )
+                    for group in groups
+                ],
+                return_exceptions=True
+            )
+        else:
+            groups = [source_names]
+            responses = [await self._call_batch_evaluator(prompt)]
 
-"""
+        raw_scores: Dict[str, Dict[str, Any]] = {}
+        for group, response in zip(groups, responses):
+            if isinstance(response, Exception) or not response:
+                continue
+            raw_scores.update(self._parse_batch_evaluation_response(response, group))
 
-        comparative_prompt += """
-**对比评分任务：**
+        if not raw_scores:
+            return {}
 
-请对所有回答进行相对评分（0-10分），要求：
+        # 验证评分区分度（以综合分作为对比基准）
+        base_scores = {name: item['scores']['overall'] for name, item in raw_scores.items()}
+        if len(base_scores) > 1:
+            score_range = max(base_scores.values()) - min(base_scores.values())
+            if score_range < 1.0:
+                logger.warning("⚠️ 对比评分区分度不足(%.1f分)，将进行调整", score_range)
+                sorted_items = sorted(base_scores.items(), key=lambda x: x[1], reverse=True)
+                for i, (name, _) in enumerate(sorted_items):
+                    base_scores[name] = 8.5 - i * 0.8  # 从8.5开始递减
+
+        results: Dict[str, Tuple[QualityMetrics, Dict[str, Any]]] = {}
+        for source_name, item in raw_scores.items():
+            metrics = self._build_evaluation_metrics(
+                answer_sources[source_name], item['scores'], base_scores[source_name],
+                stats=source_stats[source_name]
+            )
+            results[source_name] = (metrics, item['details'])
 
-1. **必须拉开评分差距**：最高分和最低分的差距至少1.5分
-2. **基于质量排序**：先判断哪个回答质量最好、哪个最差、哪个居中
-3. **参考评分区间**：
-   - 最优秀的回答：7.5-9.0分
-   - 中等质量的回答：6.0-7.5分
-   - 较差的回答：4.5-6.0分
+        logger.info("✅ 批量评估完成，评分区间: %.1f - %.1f", min(base_scores.values()), max(base_scores.values()))
+        return results
 
-4. **评分标准**：综合考虑完整性、准确性、清晰度、相关性
+    def _build_batch_evaluation_prompt(
+        self,
+        question: str,
+        answer_sources: Dict[str, str],
+        source_stats: Optional[Dict[str, Dict[str, Any]]] = None
+    ) -> str:
+        """构建批量评估的 user 提示（回答在前、问题在后），每个回答截取约800字符"""
+        source_stats = source_stats or {}
+        parts: List[str] = ["**各模型回答：**\n"]
 
-**输出格式（严格遵守）：**
+        for i, (source_name, answer_text) in enumerate(answer_sources.items(), 1):
+            excerpt, stats = self._build_comparison_excerpt(
+                answer_text, max_chars=800, stats=source_stats.get(source_name)
+            )
+            parts.append(f"""
+【回答{i}: {source_name} | 长度 {stats['char_count']} 字符，句数 {stats['sentence_count']}】
+{excerpt}
 
-```
-回答1({源名称}): X.X分 - [一句话评价]
-回答2({源名称}): X.X分 - [一句话评价]
-回答3({源名称}): X.X分 - [一句话评价]
-...
-```
+""")
 
-**排名说明：**
-[简要说明为什么这样排序，各回答的主要差异在哪里]
-"""
+        parts.append(_BATCH_EVAL_FOOTER.substitute(count=len(answer_sources), question=question))
+        return "".join(parts)
 
+    async def _call_batch_evaluator(self, prompt: str) -> str:
+        """执行一次批量评估调用"""
         try:
-            response = await call_llm_async(
-                messages=[{"role": "user", "content": comparative_prompt}],
-                model=evaluator_model,
-                max_tokens=800,
+            return await self._call_evaluator(
+                prompt,
+                system_prompt=_BATCH_EVAL_SYSTEM_PROMPT,
+                max_tokens=2500,
                 temperature=0.2,
-                registry=self.registry,
-                trace_id=self._current_trace_id,
-                parent_observation_id=self._current_parent_observation_id,
-                langfuse_metadata={
-                    "component": "quality_analyzer",
-                    "stage": "comparative_scoring"
-                },
+                stage="batch_evaluation",
             )
-
-            # 解析对比评分结果
-            comparative_scores = {}
-            for line in response.split('\n'):
-                # 匹配格式：回答X(源名称): X.X分
-                for source_name in answer_sources.keys():
-                    if source_name in line and ':' in line:
-                        # 尝试提取评分
-                        score_match = re.search(r'(\d+\.?\d*)分', line)
-                        if score_match:
-                            score = float(score_match.group(1))
-                            comparative_scores[source_name] = max(0, min(10, score))
-                            break
-
-            # 验证是否所有回答都有评分
-            for source_name in answer_sources.keys():
-                if source_name not in comparative_scores:
-                    print(f"⚠️ {source_name} 未获得对比评分，使用默认值")
-                    comparative_scores[source_name] = 7.0
-
-            # 验证评分区分度
-            scores = list(comparative_scores.values())
-            if len(scores) > 1:
-                score_range = max(scores) - min(scores)
-                if score_range < 1.0:
-                    print(f"⚠️ 对比评分区分度不足({score_range:.1f}分)，将进行调整")
-                    # 强制拉开差距
-                    sorted_items = sorted(comparative_scores.items(), key=lambda x: x[1], reverse=True)
-                    for i, (name, _) in enumerate(sorted_items):
-                        comparative_scores[name] = 8.5 - i * 0.8  # 从8.5开始递减
-
-            print(f"✅ 对比评分完成，评分区间: {min(scores):.1f} - {max(scores):.1f}")
-            return comparative_scores
-
         except Exception as e:
-            print(f"⚠️ 对比评分失败: {str(e)}, 使用默认评分")
-            # 返回默认评分
-            return {name: 7.0 for name in answer_sources.keys()}
-    
-    async def _evaluate_single_answer(
-        self,
-        question: str,
-        answer: str,
-        source_name: str,
-        base_reference_score: float = 7.0
-    ) -> QualityMetrics:
-        """评估单个回答的质量"""
-
-        evaluation_prompt = f"""
-你是一位严格的内容质量评估专家，负责对AI模型的回答进行客观、准确、有区分度的评分。
-
-原始问题：
-{question}
+            logger.warning("⚠️ 批量评估失败: %s", e)
+            return ""
 
-待评估回答（来源: {source_name}）：
-{answer}
+    async def _call_evaluator(
+        self,
+        prompt: str,
+        *,
+        max_tokens: int,
+        temperature: float,
+        stage: str,
+        system_prompt: Optional[str] = None,
+        **metadata: Any
+    ) -> str:
+        """调用评估模型；所有评估类请求共享 _EVAL_SEM 并发上限"""
+        evaluator_model = await self._ensure_evaluator_model()
 
-**参考评分：** 通过对比评估，该回答的初步综合质量为 {base_reference_score:.1f}/10分。
-请在此基础上，进行更细致的各维度评分。
+        messages = []
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+        messages.append({"role": "user", "content": prompt})
+
+        return await call_llm_async(
+            messages=messages,
+            model=evaluator_model,
+            max_tokens=max_tokens,
+            temperature=temperature,
+            registry=self.registry,
+            langfuse_metadata={
+                "component": "quality_analyzer",
+                "stage": stage,
+                **metadata,
+            },
+            semaphore=_EVAL_SEM,
+        )
 
-## 评分要求
+    def _parse_batch_evaluation_response(
+        self,
+        response: str,
+        source_names: List[str]
+    ) -> Dict[str, Dict[str, Any]]:
+        """解析批量评估返回的JSON数组（兼容 {"evaluations": [...]} 形式的对象包装）"""
+        json_str = _extract_json_block(response)
+        if json_str is None:
+            json_match = _JSON_ARRAY_RE.search(response)
+            if not json_match:
+                return {}
+            json_str = json_match.group(0)
 
-请从以下5个维度对回答进行评分（0-10分，保留一位小数）：
+        try:
+            items = _json_loads(json_str)
+        except ValueError as e:
+            logger.warning("⚠️ 批量评估JSON解析失败: %s", e)
+            return {}
 
-1. **完整性(Completeness)**: 回答是否完整地覆盖了问题的各个方面
-2. **准确性(Accuracy)**: 回答中的信息、概念、示例是否准确可靠
-3. **清晰度(Clarity)**: 回答的表达是否清晰、逻辑是否连贯、易于理解
-4. **相关性(Relevance)**: 回答是否紧扣问题主题，没有离题或冗余内容
-5. **综合质量(Overall)**: 整体回答质量（必须是前4个维度的平均值±0.5分）
+        if isinstance(items, dict):
+            items = next((value for value in items.values() if isinstance(value, list)), [])
 
-## 评分标准（严格执行）
+        known_sources = frozenset(source_names)
+        parsed: Dict[str, Dict[str, Any]] = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
 
-**使用相对评分而非绝对评分：**
-- 9.0-10.0分: 卓越表现，超越预期，几乎无瑕疵
-- 7.5-8.9分: 优秀表现，质量很高但有小的改进空间
-- 6.0-7.4分: 良好表现，基本满足需求但有明显不足
-- 4.5-5.9分: 及格表现，能回答问题但质量一般
-- 3.0-4.4分: 较差表现，存在明显问题和遗漏
-- 0.0-2.9分: 不合格，严重错误或完全未回答
+            try:
+                source_name = item.get('source')
+                if not isinstance(source_name, str) or source_name not in known_sources:
+                    index = item.get('index')
+                    if isinstance(index, int) and 1 <= index <= len(source_names):
+                        source_name = source_names[index - 1]
+                    else:
+                        continue
 
-**禁止评分行为：**
-- ❌ 禁止给所有维度都打8-10分的高分
-- ❌ 禁止不同回答获得完全相同的评分
-- ❌ 禁止给出模糊的评分理由
+                scores = {
+                    key: max(0.0, min(10.0, float(item[key])))
+                    for key in ('completeness', 'accuracy', 'clarity', 'relevance', 'overall')
+                }
 
-**必须执行：**
-- ✅ 必须引用回答中的具体内容片段作为评分依据
-- ✅ 必须明确指出至少2个优点和2个不足
-- ✅ 必须基于实际内容质量给分，不受回答长度影响
-- ✅ 综合评分必须接近前4个维度的平均值
+                details = self._default_evaluation_details()
+                feedback = item.get('feedback')
+                if isinstance(feedback, dict):
+                    for key in ('completeness', 'accuracy', 'clarity', 'relevance'):
+                        section = feedback.get(key)
+                        if not isinstance(section, dict):
+                            continue
+                        details[key]['strengths'] = self._clean_item_list(section.get('strengths'))
+                        details[key]['weaknesses'] = self._clean_item_list(section.get('weaknesses'))
+                details['unique_characteristics'] = self._clean_text_block(str(item.get('unique_characteristics') or ""))
+                details['core_suggestions'] = self._clean_item_list(item.get('core_suggestions'))
+            except Exception as e:
+                # 单个条目格式异常只跳过该条目，由调用方回退到逐个评估
+                logger.warning("⚠️ 跳过格式异常的批量评估条目: %s", e)
+                continue
 
-## 输出格式（严格遵守）
+            parsed[source_name] = {'scores': scores, 'details': details}
 
-完整性评分: X.X
-准确性评分: X.X
-清晰度评分: X.X
-相关性评分: X.X
-综合评分: X.X
+        return parsed
 
-**评分依据（必填）：**
+    @staticmethod
+    def _clean_item_list(value: Any) -> List[str]:
+        """将LLM返回的列表字段清洗为非空字符串列表，非列表一律视为空"""
+        if not isinstance(value, list):
+            return []
+        return [text for text in (str(entry).strip() for entry in value) if text]
 
-【完整性】
-✅ 优点: [引用具体内容片段，说明哪些方面做得好]
-❌ 不足: [引用具体内容片段或指出缺失的内容]
+    def _build_evaluation_metrics(
+        self,
+        answer: str,
+        scores: Dict[str, float],
+        base_reference_score: float,
+        stats: Optional[Dict[str, Any]] = None
+    ) -> QualityMetrics:
+        """以对比评分为基准调和各维度评分，生成最终质量指标"""
+        if stats is None:
+            stats = self._extract_text_statistics(answer)
 
-【准确性】
-✅ 优点: [引用准确的内容示例]
-❌ 不足: [指出不准确、误导或有争议的内容]
+        # **关键修复：使用对比评分作为基准，只允许小幅调整**
+        # 这样可以保持对比评分的区分度，同时允许细微的维度差异
+        # _harmonize_dimension_score 已保留一位小数，这里不再重复 round
+        harmonize = self._harmonize_dimension_score
+        completeness, accuracy, clarity, relevance = (
+            harmonize(base_reference_score, scores.get(key, base_reference_score))
+            for key in ('completeness', 'accuracy', 'clarity', 'relevance')
+        )
 
-【清晰度】
-✅ 优点: [说明表达清晰的部分]
-❌ 不足: [指出表达不清或逻辑混乱的部分]
+        dimension_avg = (completeness + accuracy + clarity + relevance) / 4
+        overall_from_model = harmonize(base_reference_score, scores.get('overall', dimension_avg))
+        overall = round(max(0.0, min(10.0, dimension_avg * 0.6 + overall_from_model * 0.4)), 1)
 
-【相关性】
-✅ 优点: [说明紧扣主题的部分]
-❌ 不足: [指出离题、冗余或不够聚焦的内容]
+        return QualityMetrics(
+            completeness_score=completeness,
+            accuracy_score=accuracy,
+            clarity_score=clarity,
+            relevance_score=relevance,
+            overall_score=overall,
+            word_count=stats["word_count"],
+            char_count=stats["char_count"],
+            sentence_count=stats["sentence_count"],
+            readability_score=stats["readability"],
+            information_density=stats["information_density"]
+        )
+    
+    async def _evaluate_single_answer(
+        self,
+        question: str,
+        answer: str,
+        source_name: str,
+        base_reference_score: float = 7.0
+    ) -> Tuple[QualityMetrics, Dict[str, Any]]:
+        """评估单个回答的质量（批量评估解析失败时的回退路径），评估失败时抛出异常"""
+        if _DYNAMIC_BATCH_ENABLED:
+            evaluator_model = await self._ensure_evaluator_model()
+            try:
+                merged = await _EVAL_BATCHER.submit(
+                    (id(self.registry), evaluator_model),
+                    (question, answer, source_name),
+                    self._evaluate_merged_items,
+                )
+            except Exception as e:
+                logger.warning("⚠️ 合批评估失败: %s", e)
+                merged = None
+            if merged is not None:
+                metrics = self._build_evaluation_metrics(answer, merged['scores'], base_reference_score)
+                return metrics, merged['details']
 
-**独特特征：**
-[说明这个回答与其他典型回答相比的独特之处，至少50字]
+        evaluation_prompt = f"""
+待评估回答（来源: {source_name}）：
+{answer}
 
-**核心建议：**
-[给出3个具体的改进建议]
+**参考评分：** 通过对比评估，该回答的初步综合质量为 {base_reference_score:.1f}/10分。
+请在此基础上，按照系统提示中的要求进行更细致的各维度评分。
+
+原始问题：
+{question}
 """
         
         try:
-            print(f"🤖 正在评估 {source_name} 的回答质量...")
+            logger.info("🤖 正在评估 %s 的回答质量...", source_name)
 
-            evaluator_model = await self._ensure_evaluator_model()
-            response = await call_llm_async(
-                messages=[{"role": "user", "content": evaluation_prompt}],
-                model=evaluator_model,
+            response = await self._call_evaluator(
+                evaluation_prompt,
+                system_prompt=_SINGLE_EVAL_SYSTEM_PROMPT,
                 max_tokens=1500,  # 控制token以平衡成本
                 temperature=0.2,   # 降低温度以提高评分一致性
-                registry=self.registry,
-                trace_id=self._current_trace_id,
-                parent_observation_id=self._current_parent_observation_id,
-                langfuse_metadata={
-                    "component": "quality_analyzer",
-                    "stage": "single_answer_evaluation",
-                    "source": source_name,
-                },
+                stage="single_answer_evaluation",
+                source=source_name,
             )
             
             # 解析评分结果与详细说明
             scores = self._parse_evaluation_response(response)
             details = self._parse_evaluation_details(response)
 
-            # 计算文本统计
-            stats = self._extract_text_statistics(answer)
-
-            # **关键修复：使用对比评分作为基准，只允许小幅调整**
-            # 这样可以保持对比评分的区分度，同时允许细微的维度差异
-
-            completeness = self._harmonize_dimension_score(
-                base_reference_score, scores.get('completeness', base_reference_score)
-            )
-            accuracy = self._harmonize_dimension_score(
-                base_reference_score, scores.get('accuracy', base_reference_score)
-            )
-            clarity = self._harmonize_dimension_score(
-                base_reference_score, scores.get('clarity', base_reference_score)
-            )
-            relevance = self._harmonize_dimension_score(
-                base_reference_score, scores.get('relevance', base_reference_score)
-            )
-
-            dimension_avg = (completeness + accuracy + clarity + relevance) / 4
-            overall_from_model = self._harmonize_dimension_score(
-                base_reference_score, scores.get('overall', dimension_avg)
-            )
-            overall = max(0.0, min(10.0, dimension_avg * 0.6 + overall_from_model * 0.4))
-            overall = round(overall, 1)
-
-            metrics = QualityMetrics(
-                completeness_score=round(completeness, 1),
-                accuracy_score=round(accuracy, 1),
-                clarity_score=round(clarity, 1),
-                relevance_score=round(relevance, 1),
-                overall_score=round(overall, 1),
-                word_count=stats["word_count"],
-                char_count=stats["char_count"],
-                sentence_count=stats["sentence_count"],
-                readability_score=stats["readability"],
-                information_density=stats["information_density"]
-            )
+            metrics = self._build_evaluation_metrics(answer, scores, base_reference_score)
             return metrics, details
             
         except Exception as e:
-            print(f"⚠️ 评估 {source_name} 时出错: {str(e)}")
-            return QualityMetrics(5, 5, 5, 5, 5, 0, 0, 0, 5, 5), self._default_evaluation_details()
+            # 向调用方抛出失败，由调用方决定是否使用默认值，避免占位分数被写入缓存
+            logger.warning("⚠️ 评估 %s 时出错: %s", source_name, e)
+            raise
     
+    async def _evaluate_merged_items(
+        self,
+        items: List[Tuple[str, str, str]]
+    ) -> List[Optional[Dict[str, Any]]]:
+        """动态合批的刷新回调：一次调用独立评估多个（问题, 回答, 来源）条目，按提交顺序返回解析结果"""
+        item_names = [f"条目{i}" for i in range(1, len(items) + 1)]
+        parts: List[str] = []
+        for item_name, (question, answer, source_name) in zip(item_names, items):
+            parts.append(f"""
+【{item_name} | 来源: {source_name}】
+问题：
+{question}
+
+回答：
+{answer}
+
+""")
+        parts.append(f"\n请按照系统提示中的评分任务和输出格式，对以上{len(items)}个条目分别评估。\n")
+
+        logger.info("📦 合批评估 %s 个回答...", len(items))
+        response = await self._call_evaluator(
+            "".join(parts),
+            system_prompt=_MERGED_EVAL_SYSTEM_PROMPT,
+            max_tokens=min(4000, 600 * len(items)),
+            temperature=0.2,
+            stage="merged_answer_evaluation",
+            batch_size=len(items),
+        )
+        parsed = self._parse_batch_evaluation_response(response, item_names)
+        return [parsed.get(item_name) for item_name in item_names]
+
     def _parse_evaluation_response(self, response: str) -> Dict[str, float]:
         """解析LLM评估响应"""
         scores = {}
         
-        patterns = {
-            'completeness': r'完整性评分[：:]\s*(\d+\.?\d*)',
-            'accuracy': r'准确性评分[：:]\s*(\d+\.?\d*)',
-            'clarity': r'清晰度评分[：:]\s*(\d+\.?\d*)',
-            'relevance': r'相关性评分[：:]\s*(\d+\.?\d*)',
-            'overall': r'综合评分[：:]\s*(\d+\.?\d*)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, response)
+        for key, pattern in _SCORE_PATTERNS.items():
+            match = pattern.search(response)
             if match:
                 try:
                     score = float(match.group(1))
@@ -1259,27 +2311,19 @@ class AIFusionQualityAnalyzer:
         """解析LLM返回的评估细节（优缺点、建议等）"""
         details = self._default_evaluation_details()
 
-        section_map = {
-            'completeness': '完整性',
-            'accuracy': '准确性',
-            'clarity': '清晰度',
-            'relevance': '相关性'
-        }
-
-        for key, label in section_map.items():
-            pattern = rf"【{label}】\s*✅ 优点:\s*(.*?)\s*❌ 不足:\s*(.*?)(?=\n\s*【|\n\s*\*\*|$)"
-            match = re.search(pattern, response, re.S)
+        for key, pattern in _SECTION_PATTERNS.items():
+            match = pattern.search(response)
             if match:
                 strengths_text = match.group(1).strip()
                 weaknesses_text = match.group(2).strip()
                 details[key]['strengths'] = self._normalize_insight_items(strengths_text)
                 details[key]['weaknesses'] = self._normalize_insight_items(weaknesses_text)
 
-        unique_match = re.search(r"\*\*独特特征：\*\*\s*(.*?)(?=\n\s*\*\*|$)", response, re.S)
+        unique_match = _UNIQUE_SECTION_RE.search(response)
         if unique_match:
             details['unique_characteristics'] = self._clean_text_block(unique_match.group(1))
 
-        suggestion_match = re.search(r"\*\*核心建议：\*\*\s*(.*)", response, re.S)
+        suggestion_match = _SUGGESTION_SECTION_RE.search(response)
         if suggestion_match:
             suggestions_block = suggestion_match.group(1)
             details['core_suggestions'] = self._normalize_suggestions(suggestions_block)
@@ -1292,9 +2336,9 @@ class AIFusionQualityAnalyzer:
             return []
 
         cleaned = text.strip()
-        cleaned = re.sub(r'^\*+\s*', '', cleaned)
+        cleaned = _LEADING_STARS_RE.sub('', cleaned)
 
-        segments = re.split(r'[\n；;]+', cleaned)
+        segments = _INSIGHT_SPLIT_RE.split(cleaned)
         items = []
         for segment in segments:
             item = segment.strip().strip('-•*')
@@ -1310,7 +2354,7 @@ class AIFusionQualityAnalyzer:
         lines = [line.strip() for line in text.splitlines() if line.strip()]
         suggestions = []
         for line in lines:
-            cleaned = re.sub(r'^[\d\.\-\*、]+\s*', '', line)
+            cleaned = _SUGGESTION_PREFIX_RE.sub('', line)
             if cleaned:
                 suggestions.append(cleaned.strip())
         return suggestions
@@ -1341,7 +2385,7 @@ class AIFusionQualityAnalyzer:
         fusion_answer: str
     ) -> Dict[str, Any]:
         """执行内容语义分析，识别真实差异"""
-        print("🔍 正在进行内容语义分析...")
+        logger.info("🔍 正在进行内容语义分析...")
 
         content_analysis = {
             'content_uniqueness': {},
@@ -1353,55 +2397,64 @@ class AIFusionQualityAnalyzer:
             'individualized_profiles': {}  # 新增：个性化档案
         }
 
-        try:
-            # 1. 分析各模型的角度和方法差异
-            approach_analysis = await self._analyze_response_approaches(
-                question, [r for r in llm_responses if r['success']]
-            )
-            content_analysis['approach_differences'] = approach_analysis
-
-            # 2. 计算内容相似度
-            similarity_matrix = self._calculate_content_similarity(
-                [r['response'] for r in llm_responses if r['success']], fusion_answer
-            )
-            content_analysis['semantic_similarity'] = similarity_matrix
-
-            # 3. 提取关键主题和观点
-            themes_analysis = await self._extract_content_themes(
-                question, [r for r in llm_responses if r['success']], fusion_answer
-            )
-            content_analysis['content_themes'] = themes_analysis
+        successful_responses = [r for r in llm_responses if r['success']]
 
-            # 4. 分析结构模式
-            structure_analysis = self._analyze_structure_patterns(
-                [r for r in llm_responses if r['success']], fusion_answer
+        try:
+            # 1. 角度差异与关键主题（合并为一次调用）、深度个性化分析两次 LLM 调用互不依赖，并发执行；
+            #    相似度、结构模式、内容独特性只依赖原文，放到线程中与网络等待重叠
+            approaches_and_themes, individualized_profiles, local_metrics = await asyncio.gather(
+                self._analyze_approaches_and_themes(question, successful_responses, fusion_answer),
+                self._deep_individualized_analysis(question, successful_responses),
+                asyncio.to_thread(self._compute_local_content_metrics, successful_responses, fusion_answer),
+                return_exceptions=True
             )
-            content_analysis['structure_patterns'] = structure_analysis
+            if isinstance(approaches_and_themes, Exception):
+                logger.warning("⚠️ 内容语义分析步骤 approaches_and_themes 失败: %s", approaches_and_themes)
+            else:
+                content_analysis['approach_differences'], content_analysis['content_themes'] = approaches_and_themes
 
-            # 5. 评估内容独特性
-            uniqueness_scores = self._calculate_content_uniqueness(
-                [r for r in llm_responses if r['success']], fusion_answer
-            )
-            content_analysis['content_uniqueness'] = uniqueness_scores
+            if isinstance(individualized_profiles, Exception):
+                logger.warning("⚠️ 内容语义分析步骤 individualized_profiles 失败: %s", individualized_profiles)
+            else:
+                content_analysis['individualized_profiles'] = individualized_profiles
 
-            # 6. **新增：深度个性化分析**
-            individualized_profiles = await self._deep_individualized_analysis(
-                question, [r for r in llm_responses if r['success']]
-            )
-            content_analysis['individualized_profiles'] = individualized_profiles
+            # 2-4. 内容相似度、结构模式、内容独特性
+            if isinstance(local_metrics, Exception):
+                logger.warning("⚠️ 内容语义分析失败: %s", local_metrics)
+            else:
+                content_analysis.update(local_metrics)
 
         except Exception as e:
-            print(f"⚠️ 内容语义分析失败: {str(e)}")
+            logger.warning("⚠️ 内容语义分析失败: %s", e)
             # 返回默认结构
             pass
 
         return content_analysis
     
+    def _compute_local_content_metrics(
+        self,
+        successful_responses: List[Dict],
+        fusion_answer: str
+    ) -> Dict[str, Any]:
+        """计算不需要 LLM 的内容指标：相似度、结构模式、内容独特性"""
+        return {
+            'semantic_similarity': self._calculate_content_similarity(
+                [r['response'] for r in successful_responses], fusion_answer
+            ),
+            'structure_patterns': self._analyze_structure_patterns(
+                successful_responses, fusion_answer
+            ),
+            'content_uniqueness': self._calculate_content_uniqueness(
+                successful_responses, fusion_answer
+            ),
+        }
+
     def _perform_enhanced_comparison_analysis(
         self, 
         basic_metrics: Dict[str, QualityMetrics],
         llm_evaluations: Dict[str, QualityMetrics],
-        content_analysis: Dict[str, Any]
+        content_analysis: Dict[str, Any],
+        score_table: Optional[_ScoreTable] = None
     ) -> Dict[str, Any]:
         """执行增强的对比分析（融入内容语义分析）"""
         
@@ -1423,13 +2476,10 @@ class AIFusionQualityAnalyzer:
         
         if model_evaluations:
             # 计算各维度平均分
-            avg_scores = {
-                'completeness': sum(eval.completeness_score for eval in model_evaluations.values()) / len(model_evaluations),
-                'accuracy': sum(eval.accuracy_score for eval in model_evaluations.values()) / len(model_evaluations),
-                'clarity': sum(eval.clarity_score for eval in model_evaluations.values()) / len(model_evaluations),
-                'relevance': sum(eval.relevance_score for eval in model_evaluations.values()) / len(model_evaluations),
-                'overall': sum(eval.overall_score for eval in model_evaluations.values()) / len(model_evaluations)
-            }
+            if score_table is None:
+                score_table = _ScoreTable.build(model_evaluations)
+            avg_scores = score_table.avg
+            best_individual_score = score_table.max['overall']
             
             # 融合回答的优势分析
             if fusion_eval.completeness_score > avg_scores['completeness']:
@@ -1451,7 +2501,7 @@ class AIFusionQualityAnalyzer:
             
             # 详细的个体分析
             analysis['individual_analysis'] = self._analyze_individual_performance(
-                model_evaluations, basic_metrics
+                model_evaluations, basic_metrics, score_table
             )
             
             # 统计摘要
@@ -1459,8 +2509,8 @@ class AIFusionQualityAnalyzer:
                 'fusion_overall_score': fusion_eval.overall_score,
                 'models_avg_score': avg_scores['overall'],
                 'improvement': fusion_eval.overall_score - avg_scores['overall'],
-                'best_individual_score': max(eval.overall_score for eval in model_evaluations.values()),
-                'fusion_vs_best': fusion_eval.overall_score - max(eval.overall_score for eval in model_evaluations.values())
+                'best_individual_score': best_individual_score,
+                'fusion_vs_best': fusion_eval.overall_score - best_individual_score
             }
         
         return analysis
@@ -1485,7 +2535,7 @@ class AIFusionQualityAnalyzer:
             # 如果综合评分与各维度平均分差异过大，进行调整
             if abs(overall_score - dimension_avg) > 2.0:
                 overall_score = dimension_avg
-                print(f"⚠️ {source_name} 的评分存在不一致，已调整综合评分为 {overall_score:.1f}")
+                logger.warning("⚠️ %s 的评分存在不一致，已调整综合评分为 %.1f", source_name, overall_score)
             
             ranking.append({
                 'source': source_name,
@@ -1595,7 +2645,7 @@ class AIFusionQualityAnalyzer:
             profiles_data = individualized_profiles.get('individualized_profiles', {})
 
             if profiles_data:
-                print("✅ 使用深度个性化分析结果生成模型优势描述")
+                logger.info("✅ 使用深度个性化分析结果生成模型优势描述")
                 # 使用深度分析的结果
                 for model_name in model_evaluations.keys():
                     if model_name in profiles_data:
@@ -1635,13 +2685,13 @@ class AIFusionQualityAnalyzer:
                         )
             else:
                 # 深度分析为空，使用回退方案
-                print("⚠️ 深度个性化分析结果为空，使用回退方案")
+                logger.warning("⚠️ 深度个性化分析结果为空，使用回退方案")
                 enhanced_strengths = self._fallback_enhanced_analysis(
                     model_evaluations, avg_scores, content_analysis
                 )
         else:
             # 没有深度分析，使用回退方案
-            print("⚠️ 未找到深度个性化分析结果，使用回退方案")
+            logger.warning("⚠️ 未找到深度个性化分析结果，使用回退方案")
             enhanced_strengths = self._fallback_enhanced_analysis(
                 model_evaluations, avg_scores, content_analysis
             )
@@ -1729,19 +2779,19 @@ class AIFusionQualityAnalyzer:
     def _analyze_individual_performance(
         self, 
         model_evaluations: Dict[str, QualityMetrics],
-        basic_metrics: Dict[str, QualityMetrics]
+        basic_metrics: Dict[str, QualityMetrics],
+        score_table: Optional[_ScoreTable] = None
     ) -> Dict[str, Dict[str, Any]]:
         """详细的个体性能分析"""
         individual_analysis = {}
         
-        # 计算各维度的最高分，用于相对比较
-        max_scores = {
-            'completeness': max(eval.completeness_score for eval in model_evaluations.values()),
-            'accuracy': max(eval.accuracy_score for eval in model_evaluations.values()),
-            'clarity': max(eval.clarity_score for eval in model_evaluations.values()),
-            'relevance': max(eval.relevance_score for eval in model_evaluations.values()),
-            'overall': max(eval.overall_score for eval in model_evaluations.values())
-        }
+        # 最高分、并列数、相对排名直接取自共用的评分汇总
+        if score_table is None:
+            score_table = _ScoreTable.build(model_evaluations)
+        names = score_table.names
+        max_scores = score_table.max
+        dimension_counts = score_table.max_counts
+        relative_ranks = score_table.ranks
         
         for model_name, eval_result in model_evaluations.items():
             basic_metric = basic_metrics.get(model_name)
@@ -1753,48 +2803,19 @@ class AIFusionQualityAnalyzer:
                 'improvement_potential': []
             }
             
-            # 性能亮点 - 只有唯一最高分才算"最佳"
-            # 统计每个维度有多少个模型达到最高分
-            dimension_counts = {
-                'completeness': sum(1 for eval in model_evaluations.values() if eval.completeness_score == max_scores['completeness']),
-                'accuracy': sum(1 for eval in model_evaluations.values() if eval.accuracy_score == max_scores['accuracy']),
-                'clarity': sum(1 for eval in model_evaluations.values() if eval.clarity_score == max_scores['clarity']),
-                'relevance': sum(1 for eval in model_evaluations.values() if eval.relevance_score == max_scores['relevance'])
-            }
-
-            # 只有唯一最高分才标记为"最佳"，否则标记为"并列最佳"或"优秀"
-            if eval_result.completeness_score == max_scores['completeness']:
-                if dimension_counts['completeness'] == 1:
-                    analysis['performance_highlights'].append("完整性最佳")
-                elif eval_result.completeness_score >= 8.0:
-                    analysis['performance_highlights'].append(f"完整性优秀(并列第1)")
-
-            if eval_result.accuracy_score == max_scores['accuracy']:
-                if dimension_counts['accuracy'] == 1:
-                    analysis['performance_highlights'].append("准确性最高")
-                elif eval_result.accuracy_score >= 8.0:
-                    analysis['performance_highlights'].append(f"准确性优秀(并列第1)")
-
-            if eval_result.clarity_score == max_scores['clarity']:
-                if dimension_counts['clarity'] == 1:
-                    analysis['performance_highlights'].append("表达最清晰")
-                elif eval_result.clarity_score >= 8.0:
-                    analysis['performance_highlights'].append(f"清晰度优秀(并列第1)")
-
-            if eval_result.relevance_score == max_scores['relevance']:
-                if dimension_counts['relevance'] == 1:
-                    analysis['performance_highlights'].append("相关性最强")
-                elif eval_result.relevance_score >= 8.0:
-                    analysis['performance_highlights'].append(f"相关性优秀(并列第1)")
+            # 性能亮点 - 只有唯一最高分才标记为"最佳"，否则标记为"并列最佳"或"优秀"
+            for dimension, best_label, tied_label in _PERFORMANCE_HIGHLIGHTS:
+                score = _SCORE_GETTERS[dimension](eval_result)
+                if score == max_scores[dimension]:
+                    if dimension_counts[dimension] == 1:
+                        analysis['performance_highlights'].append(best_label)
+                    elif score >= 8.0:
+                        analysis['performance_highlights'].append(tied_label)
             
             # 相对排名（在本次任务中的表现）
-            models_list = list(model_evaluations.items())
-            for dimension in ['completeness', 'accuracy', 'clarity', 'relevance', 'overall']:
-                sorted_models = sorted(models_list, 
-                                     key=lambda x: getattr(x[1], f'{dimension}_score'), 
-                                     reverse=True)
-                rank = next(i for i, (name, _) in enumerate(sorted_models, 1) if name == model_name)
-                analysis['relative_ranking'][dimension] = f"{rank}/{len(models_list)}"
+            for dimension in _SCORE_DIMENSIONS:
+                rank = relative_ranks[dimension][model_name]
+                analysis['relative_ranking'][dimension] = f"{rank}/{len(names)}"
             
             # 风格特征分析（个性化）
             if basic_metric and basic_metric.char_count > 0:
@@ -1839,25 +2860,13 @@ class AIFusionQualityAnalyzer:
             
             # 个性化的改进建议
             if weakest[1] < 6.0:
-                improvement_suggestions = {
-                    '完整性': '可增加回答的全面性和深度',
-                    '准确性': '需要提高信息的准确性和可靠性',
-                    '清晰度': '表达可以更加清晰明了',
-                    '相关性': '需要更好地理解和对针问题核心'
-                }
-                analysis['improvement_potential'].append(improvement_suggestions.get(weakest[0], f"{weakest[0]}有提升空间"))
+                analysis['improvement_potential'].append(_IMPROVEMENT_SUGGESTIONS.get(weakest[0], f"{weakest[0]}有提升空间"))
             elif weakest[1] < 7.5:
                 analysis['improvement_potential'].append(f"{weakest[0]}表现尚可，有进一步优化空间")
             
             # 优势维度分析
             if strongest[1] >= 8.5:
-                excellence_descriptions = {
-                    '完整性': '在内容完整性方面表现突出，可作为核心竞争力',
-                    '准确性': '信息准确性是该模型的最大亮点',
-                    '清晰度': '表达清晰度优秀，适合复杂问题解释',
-                    '相关性': '对问题的理解和对针性是显著优势'
-                }
-                analysis['improvement_potential'].append(excellence_descriptions.get(strongest[0], f"在{strongest[0]}方面表现突出"))
+                analysis['improvement_potential'].append(_EXCELLENCE_DESCRIPTIONS.get(strongest[0], f"在{strongest[0]}方面表现突出"))
             elif strongest[1] >= 8.0:
                 analysis['improvement_potential'].append(f"{strongest[0]}表现优秀，可作为相对优势")
             
@@ -1872,40 +2881,11 @@ class AIFusionQualityAnalyzer:
     
     def _analyze_model_specificity(self, model_name: str, eval_result: QualityMetrics, basic_metric: QualityMetrics) -> List[str]:
         """分析模型特异性，避免同质化分析"""
-        specificity = []
-        
-        # 基于模型名称的特异性分析
-        model_traits = {
-            'claude_sonnet4': [
-                f"逻辑推理能力在本次任务中评分为{eval_result.clarity_score:.1f}",
-                f"适合复杂问题分析和深度思考"
-            ],
-            'gpt-41-0414-global': [
-                f"数学和逻辑分析能力在本次表现为{eval_result.accuracy_score:.1f}分",
-                f"技术问题处理能力较强"
-            ],
-            'qwen-max': [
-                f"中文理解和处理能力在本次任务中表现为{eval_result.relevance_score:.1f}分",
-                f"对中文语境和文化背景理解深入"
-            ],
-            'claude37_sonnet_new': [
-                f"平衡性表现，本次综合评分{eval_result.overall_score:.1f}",
-                f"适合日常对话和通用任务"
-            ],
-            'qwen-plus': [
-                f"性价比较高，本次任务中效率表现良好",
-                f"实用性强，适合多种场景"
-            ],
-            'gpt-41-mini-0414-global': [
-                f"快速响应特性，适合轻量级任务",
-                f"效率导向，资源节约型模型"
-            ]
-        }
-        
-        if model_name in model_traits:
-            specificity.extend(model_traits[model_name][:1])  # 只取第一个特异性描述
-        
-        return specificity
+        # 基于模型名称的特异性分析：只格式化命中模型的那一条描述
+        template = _MODEL_TRAIT_TEMPLATES.get(model_name)
+        if template is None:
+            return []
+        return [template.format(m=eval_result)]
     
     async def _deep_individualized_analysis(
         self,
@@ -1919,7 +2899,16 @@ class AIFusionQualityAnalyzer:
         if not responses or len(responses) < 2:
             return {}
 
-        print("🔍 正在进行深度个性化分析...")
+        # 完全相同的回答只放入提示一次，解析后再把档案复制给同组的其它模型
+        # 所有回答都相同时只分析一个代表，档案同样复制给全部模型
+        duplicate_groups: Dict[int, List[Dict]] = {}
+        for response in responses:
+            duplicate_groups.setdefault(_fast_key(response['response']), []).append(response)
+        if len(duplicate_groups) < len(responses):
+            logger.info("♻️ 检测到重复回答，深度分析仅包含 %s/%s 个", len(duplicate_groups), len(responses))
+        responses = [members[0] for members in duplicate_groups.values()]
+
+        logger.info("🔍 正在进行深度个性化分析...")
 
         try:
             # 构建强制差异化分析提示
@@ -1934,8 +2923,8 @@ class AIFusionQualityAnalyzer:
             for i, response in enumerate(responses, 1):
                 model_name = response['model_name']
                 answer_text = response['response']
-                # 提供完整内容以便深度分析
-                truncated = answer_text[:800] + "..." if len(answer_text) > 800 else answer_text
+                # 超过800字符时抽取与问题最相关的句子，而不是简单截断开头
+                truncated = _extract_salient(answer_text, question, 800)
                 individualization_prompt += f"""
 ━━━━━━━━━━━━━━━━━━━━━━
 【模型{i}: {model_name}】
@@ -2022,109 +3011,128 @@ class AIFusionQualityAnalyzer:
 - ✅ 必须给出个性化的场景推荐，不能通用化
 """
 
-            evaluator_model = await self._ensure_evaluator_model()
-            response = await call_llm_async(
-                messages=[{"role": "user", "content": individualization_prompt}],
-                model=evaluator_model,
-                max_tokens=1800,  # 控制token数以支持详细分析
+            response = await self._call_evaluator(
+                individualization_prompt,
+                # 按模型数给输出预算：每个档案约500 token + 差异总结，上限1800
+                max_tokens=min(1800, 400 + 500 * len(responses)),
                 temperature=0.4,   # 适当提高温度以增加多样性
-                registry=self.registry,
-                trace_id=self._current_trace_id,
-                parent_observation_id=self._current_parent_observation_id,
-                langfuse_metadata={
-                    "component": "quality_analyzer",
-                    "stage": "individualized_profiles"
-                },
+                stage="individualized_profiles",
             )
 
-            # 解析JSON结果
+            # 解析JSON结果（没有代码块时尝试直接解析）
             try:
-                json_match = re.search(r'```json\s*(.*?)\s*```', response, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group(1)
-                    result = json.loads(json_str)
-                    print(f"✅ 深度个性化分析完成，已识别{len(result.get('individualized_profiles', {}))}个模型的独特特征")
-                    return result
-                else:
-                    # 尝试直接解析
-                    result = json.loads(response)
-                    return result
+                json_str = _extract_json_block(response)
+                result = _json_loads(json_str if json_str is not None else response)
+                if not isinstance(result, dict):
+                    raise ValueError("返回结果不是JSON对象")
             except Exception as parse_error:
-                print(f"⚠️ JSON解析失败: {str(parse_error)}, 使用回退方案")
+                logger.warning("⚠️ JSON解析失败: %s, 使用回退方案", parse_error)
                 # 返回基础结构
                 return {
                     "individualized_profiles": {},
                     "differentiation_summary": "深度分析解析失败"
                 }
 
+            profiles = result.get('individualized_profiles')
+            if isinstance(profiles, dict):
+                for members in duplicate_groups.values():
+                    representative = members[0]['model_name']
+                    if representative in profiles:
+                        for member in members[1:]:
+                            profiles.setdefault(member['model_name'], profiles[representative])
+                logger.info("✅ 深度个性化分析完成，已识别%s个模型的独特特征", len(profiles))
+            return result
+
         except Exception as e:
-            print(f"⚠️ 深度个性化分析失败: {str(e)}")
+            logger.warning("⚠️ 深度个性化分析失败: %s", e)
             return {}
 
-    async def _analyze_response_approaches(
+    async def _analyze_approaches_and_themes(
         self,
         question: str,
-        responses: List[Dict]
-    ) -> Dict[str, Any]:
-        """分析各模型回答的方法和角度差异"""
+        responses: List[Dict],
+        fusion_answer: str
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        一次调用同时完成角度差异分析与主题提取，返回 (approach_differences, content_themes)
+        两项任务共用问题与各模型回答摘录，合并后这部分输入只发送一次
+        """
         if not responses:
-            return {}
+            return {}, {}
+
+        approaches_fallback = {"model_approaches": {}, "differentiation_summary": "解析失败"}
+        themes_fallback = {"main_themes": [], "model_unique_points": {}, "common_points": [], "fusion_additions": []}
 
         try:
-            # 构建分析提示
-            analysis_prompt = f"""
-请分析以下各个AI模型对同一问题的回答方法和角度差异。
+            parts = [f"""
+请分析以下各个AI模型对同一问题的回答，完成两项任务。
 
 问题: {question}
 
 各模型回答:
-"""
+"""]
             for i, response in enumerate(responses, 1):
-                analysis_prompt += f"\n【模型{i}: {response['model_name']}】\n{response['response'][:300]}...\n"
+                parts.append(f"\n【模型{i}: {response['model_name']}】\n{response['response'][:300]}...\n")
+
+            parts.append(f"""
+【融合回答】
+{fusion_answer[:200]}...
 
-            analysis_prompt += """
+## 任务1：回答方法和角度差异
 请从以下角度分析各模型的差异:
 1. 解答方法 (理论分析、实例举证、步骤指导等)
 2. 侧重点 (技术细节、实用建议、理论原理等)
 3. 表达风格 (简洁直接、详细阐述、结构化等)
 4. 独特观点 (各模型特有的见解或方法)
 
-请以JSON格式返回分析结果:
+## 任务2：主要主题和关键观点
+请分析:
+1. 各回答涵盖的主要主题
+2. 每个模型的独特观点
+3. 共同观点
+4. 融合回答新增的内容
+
+请以JSON格式返回两项任务的结果（"模型名"填写【模型i: 名称】中冒号后的名称）:
 {{
-    "model_approaches": {{
-        "模型名": {{"method": "方法", "focus": "侧重点", "style": "风格", "unique_insights": ["独特观点1", "独特观点2"]}}
+    "approaches": {{
+        "model_approaches": {{
+            "模型名": {{"method": "方法", "focus": "侧重点", "style": "风格", "unique_insights": ["独特观点1", "独特观点2"]}}
+        }},
+        "differentiation_summary": "差异化总结"
     }},
-    "differentiation_summary": "差异化总结"
+    "themes": {{
+        "main_themes": ["主题1", "主题2"],
+        "model_unique_points": {{"模型名": ["观点1", "观点2"]}},
+        "common_points": ["共同观点1", "共同观点2"],
+        "fusion_additions": ["融合新增内容1", "融合新增内容2"]
+    }}
 }}
-"""
+""")
 
-            evaluator_model = await self._ensure_evaluator_model()
-            response = await call_llm_async(
-                messages=[{"role": "user", "content": analysis_prompt}],
-                model=evaluator_model,
-                max_tokens=700,
+            response = await self._call_evaluator(
+                "".join(parts),
+                max_tokens=1400,
                 temperature=0.3,
-                registry=self.registry,
-                trace_id=self._current_trace_id,
-                parent_observation_id=self._current_parent_observation_id,
-                langfuse_metadata={
-                    "component": "quality_analyzer",
-                    "stage": "approach_analysis"
-                },
+                stage="approach_and_theme_analysis",
             )
 
-            # 尝试解析JSON
-            import json
             try:
-                result = json.loads(response)
-                return result
-            except:
-                # 如果JSON解析失败，返回简化版本
-                return {"model_approaches": {}, "differentiation_summary": "解析失败"}
+                result = _json_loads(_extract_json_block(response) or response)
+            except ValueError:
+                return approaches_fallback, themes_fallback
+
+            if not isinstance(result, dict):
+                return approaches_fallback, themes_fallback
+            approaches = result.get('approaches')
+            themes = result.get('themes')
+            return (
+                approaches if isinstance(approaches, dict) else approaches_fallback,
+                themes if isinstance(themes, dict) else themes_fallback,
+            )
 
         except Exception as e:
-            print(f"⚠️ 角度分析失败: {str(e)}")
-            return {}
+            logger.warning("⚠️ 角度与主题分析失败: %s", e)
+            return {}, {}
     
     def _calculate_content_similarity(
         self, 
@@ -2134,31 +3142,32 @@ class AIFusionQualityAnalyzer:
         """计算内容相似度矩阵"""
         similarity_matrix = {}
         
-        # 简单的相似度计算（基于关键词重叠）
-        def calculate_keyword_similarity(text1: str, text2: str) -> float:
-            # 提取关键词
-            words1 = set(re.findall(r'[\w\u4e00-\u9fff]+', text1.lower()))
-            words2 = set(re.findall(r'[\w\u4e00-\u9fff]+', text2.lower()))
-            
+        # 简单的相似度计算（基于关键词重叠），每段文本只切分一次
+        def calculate_keyword_similarity(words1: frozenset, words2: frozenset) -> float:
             if not words1 or not words2:
                 return 0.0
+            if words1 is words2:
+                # 相同文本命中同一个缓存集合，无需求交集
+                return 1.0
             
             # 计算Jaccard相似度
-            intersection = len(words1.intersection(words2))
-            union = len(words1.union(words2))
+            intersection = len(words1 & words2)
+            union = len(words1) + len(words2) - intersection
             
             return intersection / union if union > 0 else 0.0
         
+        response_keywords = [_keyword_set(response) for response in responses]
+        fusion_keywords = _keyword_set(fusion_answer)
+        
         # 计算各回答间的相似度
-        for i, response1 in enumerate(responses):
-            for j, response2 in enumerate(responses):
-                if i < j:
-                    similarity = calculate_keyword_similarity(response1, response2)
-                    similarity_matrix[f"model_{i+1}_vs_model_{j+1}"] = similarity
+        for i, words1 in enumerate(response_keywords):
+            for j in range(i + 1, len(response_keywords)):
+                similarity = calculate_keyword_similarity(words1, response_keywords[j])
+                similarity_matrix[f"model_{i+1}_vs_model_{j+1}"] = similarity
         
         # 计算与融合回答的相似度
-        for i, response in enumerate(responses):
-            similarity = calculate_keyword_similarity(response, fusion_answer)
+        for i, words in enumerate(response_keywords):
+            similarity = calculate_keyword_similarity(words, fusion_keywords)
             similarity_matrix[f"model_{i+1}_vs_fusion"] = similarity
         
         # 计算平均相似度
@@ -2168,72 +3177,6 @@ class AIFusionQualityAnalyzer:
         
         return similarity_matrix
     
-    async def _extract_content_themes(
-        self, 
-        question: str,
-        responses: List[Dict], 
-        fusion_answer: str
-    ) -> Dict[str, Any]:
-        """提取内容主题和关键观点"""
-        if not responses:
-            return {}
-        
-        try:
-            themes_prompt = f"""
-请提取以下回答中的主要主题和关键观点。
-
-问题: {question}
-
-各模型回答:
-"""
-            for i, response in enumerate(responses, 1):
-                themes_prompt += f"\n【模型{i}】\n{response['response'][:200]}...\n"
-            
-            themes_prompt += f"""
-【融合回答】
-{fusion_answer[:200]}...
-
-请分析:
-1. 各回答涵盖的主要主题
-2. 每个模型的独特观点
-3. 共同观点
-4. 融合回答新增的内容
-
-返回JSON格式:
-{{
-    "main_themes": ["主题1", "主题2"],
-    "model_unique_points": {{"模型名": ["观点1", "观点2"]}},
-    "common_points": ["共同观点1", "共同观点2"],
-    "fusion_additions": ["融合新增内容1", "融合新增内容2"]
-}}
-"""
-            
-            evaluator_model = await self._ensure_evaluator_model()
-            response = await call_llm_async(
-                messages=[{"role": "user", "content": themes_prompt}],
-                model=evaluator_model,
-                max_tokens=700,
-                temperature=0.3,
-                registry=self.registry,
-                trace_id=self._current_trace_id,
-                parent_observation_id=self._current_parent_observation_id,
-                langfuse_metadata={
-                    "component": "quality_analyzer",
-                    "stage": "theme_extraction"
-                },
-            )
-            
-            try:
-                import json
-                result = json.loads(response)
-                return result
-            except:
-                return {"main_themes": [], "model_unique_points": {}, "common_points": [], "fusion_additions": []}
-                
-        except Exception as e:
-            print(f"⚠️ 主题提取失败: {str(e)}")
-            return {}
-    
     def _analyze_structure_patterns(
         self, 
         responses: List[Dict], 
@@ -2244,17 +3187,15 @@ class AIFusionQualityAnalyzer:
         
         def analyze_text_structure(text: str) -> Dict[str, Any]:
             # 分析文本结构特征
-            lines = text.split('\n')
             paragraphs = [p.strip() for p in text.split('\n\n') if p.strip()]
             
-            # 检测列表项
-            list_items = len(re.findall(r'^[•\-\*\d+\.\)]\s+', text, re.MULTILINE))
-            
-            # 检测标题或重点
-            headers = len(re.findall(r'^[#]+\s+|^\*\*.*\*\*|^【.*】', text, re.MULTILINE))
+            # 一次扫描同时检测列表项与标题/重点
+            line_counts = Counter(match.lastgroup for match in _LINE_STRUCTURE_RE.finditer(text))
+            list_items = line_counts['list']
+            headers = line_counts['header']
             
             # 检测代码块
-            code_blocks = len(re.findall(r'```|`[^`]+`', text))
+            code_blocks = len(_CODE_RE.findall(text))
             
             return {
                 'paragraph_count': len(paragraphs),
@@ -2286,41 +3227,25 @@ class AIFusionQualityAnalyzer:
         
         # 提取所有文本的关键词
         all_texts = [r['response'] for r in responses] + [fusion_answer]
-        all_keywords = []
+        all_keywords = [_keyword_set(text) for text in all_texts]
         
-        for text in all_texts:
-            keywords = set(re.findall(r'[\w\u4e00-\u9fff]+', text.lower()))
-            all_keywords.append(keywords)
+        # 关键词出现在几段文本中；只出现一次的即为该文本独有
+        document_frequency = Counter()
+        for keywords in all_keywords:
+            document_frequency.update(keywords)
+        
+        def unique_ratio(keywords: frozenset) -> float:
+            if not keywords:
+                return 0.0
+            unique_count = sum(1 for word in keywords if document_frequency[word] == 1)
+            return unique_count / len(keywords)
         
         # 计算每个回答的独特性
         for i, response in enumerate(responses):
-            model_keywords = all_keywords[i]
-            other_keywords = set()
-            
-            # 收集其他回答的关键词
-            for j, other_keywords_set in enumerate(all_keywords):
-                if j != i:
-                    other_keywords.update(other_keywords_set)
-            
-            # 计算独特关键词比例
-            if model_keywords:
-                unique_keywords = model_keywords - other_keywords
-                uniqueness_score = len(unique_keywords) / len(model_keywords)
-                uniqueness_scores[response['model_name']] = uniqueness_score
-            else:
-                uniqueness_scores[response['model_name']] = 0.0
+            uniqueness_scores[response['model_name']] = unique_ratio(all_keywords[i])
         
         # 计算融合回答的独特性
-        fusion_keywords = all_keywords[-1]
-        model_keywords_union = set()
-        for keywords in all_keywords[:-1]:
-            model_keywords_union.update(keywords)
-        
-        if fusion_keywords:
-            fusion_unique = fusion_keywords - model_keywords_union
-            uniqueness_scores['fusion_answer'] = len(fusion_unique) / len(fusion_keywords)
-        else:
-            uniqueness_scores['fusion_answer'] = 0.0
+        uniqueness_scores['fusion_answer'] = unique_ratio(all_keywords[-1])
         
         return uniqueness_scores
     
@@ -2331,7 +3256,7 @@ class AIFusionQualityAnalyzer:
         content_analysis: Dict[str, Any]
     ) -> Dict[str, Any]:
         """执行逻辑一致性验证"""
-        print("🔍 正在进行逻辑一致性验证...")
+        logger.info("🔍 正在进行逻辑一致性验证...")
         
         consistency_issues = []
         corrections = {}
@@ -2489,20 +3414,18 @@ class AIFusionQualityAnalyzer:
         
         # 检查是否所有模型都有相同的优势描述
         if model_strengths:
-            all_strengths = list(model_strengths.values())
+            # 每个模型的优势描述只切分一次
+            word_sets = [frozenset(' '.join(strengths).split()) for strengths in model_strengths.values()]
             
             # 计算描述相似度
             similar_count = 0
             total_comparisons = 0
             
-            for i in range(len(all_strengths)):
-                for j in range(i + 1, len(all_strengths)):
+            for i, words1 in enumerate(word_sets):
+                for words2 in word_sets[i + 1:]:
                     total_comparisons += 1
                     # 简单的相似度检查（共同词汇）
-                    str1 = ' '.join(all_strengths[i])
-                    str2 = ' '.join(all_strengths[j])
-                    common_words = len(set(str1.split()) & set(str2.split()))
-                    if common_words > 3:  # 如果有超过3个共同词汇
+                    if len(words1 & words2) > 3:  # 如果有超过3个共同词汇
                         similar_count += 1
             
             if total_comparisons > 0 and similar_count / total_comparisons > 0.7:
@@ -2606,7 +3529,8 @@ class AIFusionQualityAnalyzer:
         self,
         llm_evaluations: Dict[str, QualityMetrics],
         comparison_analysis: Dict[str, Any],
-        content_analysis: Dict[str, Any]
+        content_analysis: Dict[str, Any],
+        score_table: Optional[_ScoreTable] = None
     ) -> Dict[str, Any]:
         """
         融合效果量化分析 - 对比融合前后的质量提升
@@ -2617,7 +3541,7 @@ class AIFusionQualityAnalyzer:
         3. 内容整合效果
         4. 最佳实践建议
         """
-        print("🔍 正在进行融合效果量化分析...")
+        logger.info("🔍 正在进行融合效果量化分析...")
 
         fusion_eval = llm_evaluations.get('fusion_answer')
         if not fusion_eval:
@@ -2640,7 +3564,7 @@ class AIFusionQualityAnalyzer:
             }
 
         # 1. 计算各维度的统计数据
-        dimension_stats = self._calculate_dimension_statistics(model_evaluations, fusion_eval)
+        dimension_stats = self._calculate_dimension_statistics(model_evaluations, fusion_eval, score_table)
 
         # 2. 量化各维度的提升
         dimension_improvements = self._quantify_dimension_improvements(
@@ -2678,34 +3602,37 @@ class AIFusionQualityAnalyzer:
     def _calculate_dimension_statistics(
         self,
         model_evaluations: Dict[str, QualityMetrics],
-        fusion_eval: QualityMetrics
+        fusion_eval: QualityMetrics,
+        score_table: Optional[_ScoreTable] = None
     ) -> Dict[str, Any]:
         """计算各维度的统计数据"""
-        dimensions = ['completeness', 'accuracy', 'clarity', 'relevance', 'overall']
+        if score_table is None:
+            score_table = _ScoreTable.build(model_evaluations)
         stats = {}
 
-        for dim in dimensions:
-            scores = [getattr(eval, f'{dim}_score') for eval in model_evaluations.values()]
-            fusion_score = getattr(fusion_eval, f'{dim}_score')
+        for dim, scores in score_table.columns.items():
+            fusion_score = _SCORE_GETTERS[dim](fusion_eval)
 
             stats[dim] = {
-                'model_avg': sum(scores) / len(scores),
-                'model_max': max(scores),
+                'model_avg': score_table.avg[dim],
+                'model_max': score_table.max[dim],
                 'model_min': min(scores),
-                'model_std': self._calculate_std(scores),
+                'model_std': self._calculate_std(scores, mean=score_table.avg[dim]),
                 'fusion_score': fusion_score,
                 'models_count': len(scores)
             }
 
         return stats
 
-    def _calculate_std(self, scores: List[float]) -> float:
-        """计算标准差"""
-        if len(scores) < 2:
+    def _calculate_std(self, scores: List[float], mean: Optional[float] = None) -> float:
+        """计算总体标准差（已有均值时直接传入，省去一次求和）"""
+        n = len(scores)
+        if n < 2:
             return 0.0
-        mean = sum(scores) / len(scores)
-        variance = sum((s - mean) ** 2 for s in scores) / len(scores)
-        return variance ** 0.5
+        if mean is None:
+            mean = math.fsum(scores) / n
+        # fsum 在 C 层做补偿求和，避免逐项累加的舍入误差
+        return math.sqrt(math.fsum((s - mean) * (s - mean) for s in scores) / n)
 
     def _quantify_dimension_improvements(
         self,
@@ -2715,9 +3642,8 @@ class AIFusionQualityAnalyzer:
     ) -> Dict[str, Any]:
         """量化各维度的提升"""
         improvements = {}
-        dimensions = ['completeness', 'accuracy', 'clarity', 'relevance', 'overall']
 
-        for dim in dimensions:
+        for dim in _SCORE_DIMENSIONS:
             stats = dimension_stats[dim]
             fusion_score = stats['fusion_score']
             model_avg = stats['model_avg']
@@ -2731,26 +3657,13 @@ class AIFusionQualityAnalyzer:
             improvement_pct_vs_avg = (improvement_vs_avg / model_avg * 100) if model_avg > 0 else 0
             improvement_pct_vs_max = (improvement_vs_max / model_max * 100) if model_max > 0 else 0
 
-            # 判断提升显著性
-            if improvement_vs_avg > 1.0:
-                significance = "显著提升"
-            elif improvement_vs_avg > 0.5:
-                significance = "明显提升"
-            elif improvement_vs_avg > 0.2:
-                significance = "轻微提升"
-            elif improvement_vs_avg > -0.2:
-                significance = "基本持平"
-            elif improvement_vs_avg > -0.5:
-                significance = "轻微下降"
-            else:
-                significance = "明显下降"
-
             improvements[dim] = {
                 'absolute_improvement_vs_avg': round(improvement_vs_avg, 2),
                 'absolute_improvement_vs_max': round(improvement_vs_max, 2),
                 'percentage_improvement_vs_avg': round(improvement_pct_vs_avg, 1),
                 'percentage_improvement_vs_max': round(improvement_pct_vs_max, 1),
-                'significance': significance,
+                # 判断提升显著性：阈值为严格大于，bisect_left 恰好落在对应区间
+                'significance': _SIGNIFICANCE_LABELS[bisect_left(_SIGNIFICANCE_THRESHOLDS, improvement_vs_avg)],
                 'fusion_score': fusion_score,
                 'models_avg': model_avg,
                 'models_max': model_max
@@ -2767,40 +3680,22 @@ class AIFusionQualityAnalyzer:
         """评估融合价值"""
 
         # 1. 质量提升价值（40分）
-        quality_value = 0
         overall_imp = dimension_improvements['overall']['absolute_improvement_vs_avg']
-        if overall_imp > 1.0:
-            quality_value = 40
-        elif overall_imp > 0.5:
-            quality_value = 30
-        elif overall_imp > 0.2:
-            quality_value = 20
-        elif overall_imp > 0:
-            quality_value = 10
+        quality_value = _QUALITY_VALUE_POINTS[bisect_left(_QUALITY_VALUE_THRESHOLDS, overall_imp)]
 
         # 2. 内容整合价值（30分）
-        integration_value = 0
-        content_themes = content_analysis.get('content_themes', {})
-        fusion_additions = content_themes.get('fusion_additions', [])
-        if len(fusion_additions) >= 3:
-            integration_value = 30
-        elif len(fusion_additions) >= 2:
-            integration_value = 20
-        elif len(fusion_additions) >= 1:
-            integration_value = 10
-
-        # 3. 一致性价值（15分）
-        consistency_value = 15  # 默认满分
-        # 如果融合回答比最佳单模型还低，扣分
-        if dimension_improvements['overall']['absolute_improvement_vs_max'] < -0.5:
-            consistency_value = 0
-        elif dimension_improvements['overall']['absolute_improvement_vs_max'] < 0:
-            consistency_value = 10
+        # 每个融合新增点 10 分，最多 3 个
+        fusion_additions = content_analysis.get('content_themes', {}).get('fusion_additions', [])
+        integration_value = min(len(fusion_additions), 3) * 10
+
+        # 3. 一致性价值（15分）：融合回答比最佳单模型还低时扣分
+        overall_vs_max = dimension_improvements['overall']['absolute_improvement_vs_max']
+        consistency_value = _CONSISTENCY_VALUE_POINTS[bisect_right(_CONSISTENCY_VALUE_THRESHOLDS, overall_vs_max)]
 
         # 4. 全面性价值（15分）
-        comprehensiveness_value = 0
-        positive_dims = sum(1 for dim in ['completeness', 'accuracy', 'clarity', 'relevance']
-                           if dimension_improvements[dim]['absolute_improvement_vs_avg'] > 0)
+        positive_dims = sum(
+            dimension_improvements[dim]['absolute_improvement_vs_avg'] > 0 for dim in _CORE_DIMENSIONS
+        )
         comprehensiveness_value = positive_dims * 3.75  # 每个维度3.75分
 
         total_score = quality_value + integration_value + consistency_value + comprehensiveness_value
@@ -2817,16 +3712,7 @@ class AIFusionQualityAnalyzer:
 
     def _get_value_level(self, score: float) -> str:
         """获取价值等级"""
-        if score >= 80:
-            return "优秀"
-        elif score >= 60:
-            return "良好"
-        elif score >= 40:
-            return "一般"
-        elif score >= 20:
-            return "较差"
-        else:
-            return "很差"
+        return _VALUE_LEVEL_LABELS[bisect_right(_VALUE_LEVEL_THRESHOLDS, score)]
 
     def _analyze_integration_effectiveness(
         self,
@@ -2836,20 +3722,17 @@ class AIFusionQualityAnalyzer:
     ) -> Dict[str, Any]:
         """分析内容整合效果"""
 
-        # 1. 内容覆盖度
-        content_themes = content_analysis.get('content_themes', {})
-        common_points = content_themes.get('common_points', [])
-        fusion_additions = content_themes.get('fusion_additions', [])
-        model_unique_points = content_themes.get('model_unique_points', {})
-
+        # 1. 内容覆盖度：各类观点只取一次数量
+        content_themes = content_analysis.get('content_themes') or {}
+        common_count = len(content_themes.get('common_points') or ())
+        addition_count = len(content_themes.get('fusion_additions') or ())
         # 计算总的独特观点数
-        total_unique_points = sum(len(points) for points in model_unique_points.values())
+        total_unique_points = sum(map(len, (content_themes.get('model_unique_points') or {}).values()))
 
-        coverage_score = min(100, (len(common_points) + total_unique_points) * 10)
+        coverage_score = min(100, (common_count + total_unique_points) * 10)
 
-        # 2. 新增内容价值
-        addition_value = len(fusion_additions) * 20  # 每个新增点20分
-        addition_value = min(100, addition_value)
+        # 2. 新增内容价值：每个新增点20分
+        addition_value = min(100, addition_count * 20)
 
         # 3. 内容独特性
         uniqueness_scores = content_analysis.get('content_uniqueness', {})
@@ -2858,13 +3741,17 @@ class AIFusionQualityAnalyzer:
         # 4. 结构优化
         structure_patterns = content_analysis.get('structure_patterns', {})
         fusion_structure = structure_patterns.get('fusion_answer', {})
-        model_structures = {k: v for k, v in structure_patterns.items() if k != 'fusion_answer'}
 
-        # 计算结构改进
-        if model_structures:
-            avg_structure_score = sum(
-                s.get('has_structured_format', False) for s in model_structures.values()
-            ) / len(model_structures)
+        # 计算结构改进：一次遍历统计单模型中有结构化格式的数量
+        model_count = structured_count = 0
+        for name, pattern in structure_patterns.items():
+            if name == 'fusion_answer':
+                continue
+            model_count += 1
+            structured_count += pattern.get('has_structured_format', False)
+
+        if model_count:
+            avg_structure_score = structured_count / model_count
             fusion_has_structure = fusion_structure.get('has_structured_format', False)
             structure_improvement = fusion_has_structure and avg_structure_score < 0.5
         else:
@@ -2875,8 +3762,8 @@ class AIFusionQualityAnalyzer:
             'addition_value': round(addition_value, 1),
             'fusion_uniqueness': round(fusion_uniqueness * 100, 1),
             'structure_improved': structure_improvement,
-            'common_points_covered': len(common_points),
-            'new_content_added': len(fusion_additions),
+            'common_points_covered': common_count,
+            'new_content_added': addition_count,
             'total_unique_perspectives': total_unique_points
         }
 
@@ -2892,21 +3779,10 @@ class AIFusionQualityAnalyzer:
         total_score = fusion_value['total_score']
         overall_imp = dimension_improvements['overall']['absolute_improvement_vs_avg']
 
-        if total_score >= 80 and overall_imp > 0.5:
-            level = "卓越"
-            emoji = "🌟"
-        elif total_score >= 60 and overall_imp > 0.2:
-            level = "优秀"
-            emoji = "⭐"
-        elif total_score >= 40 and overall_imp >= 0:
-            level = "良好"
-            emoji = "✅"
-        elif total_score >= 20:
-            level = "一般"
-            emoji = "⚠️"
-        else:
-            level = "需改进"
-            emoji = "❌"
+        level, emoji = next(
+            ((level, emoji) for matches, level, emoji in _EFFECTIVENESS_LEVELS if matches(total_score, overall_imp)),
+            ("需改进", "❌")
+        )
 
         effectiveness_level = f"{emoji} {level} ({total_score:.1f}/100)"
 
@@ -2918,32 +3794,15 @@ class AIFusionQualityAnalyzer:
             if dim == 'overall':
                 continue
             if imp_data['absolute_improvement_vs_avg'] < 0:
-                dim_name_map = {
-                    'completeness': '完整性',
-                    'accuracy': '准确性',
-                    'clarity': '清晰度',
-                    'relevance': '相关性'
-                }
                 recommendations.append(
-                    f"融合过程中{dim_name_map[dim]}有所下降，建议加强该维度的内容整合"
+                    f"融合过程中{_DIMENSION_LABELS[dim]}有所下降，建议加强该维度的内容整合"
                 )
 
-        # 基于内容整合效果给出建议
-        if integration_effectiveness['new_content_added'] == 0:
-            recommendations.append("融合回答未添加新内容，建议在融合时增加综合性见解")
-
-        if integration_effectiveness['fusion_uniqueness'] < 10:
-            recommendations.append("融合回答独特性较低，建议增加独特的综合性分析")
-
-        if not integration_effectiveness['structure_improved']:
-            recommendations.append("可以进一步优化回答的结构组织，提高可读性")
-
-        # 基于融合价值给出建议
-        if fusion_value['quality_value'] < 20:
-            recommendations.append("整体质量提升有限，建议优化融合算法或模型选择")
-
-        if fusion_value['integration_value'] < 15:
-            recommendations.append("内容整合价值较低，建议更好地融合各模型的优势观点")
+        # 基于内容整合效果和融合价值给出建议
+        recommendations.extend(
+            message for matches, message in _EFFECTIVENESS_RULES
+            if matches(integration_effectiveness, fusion_value)
+        )
 
         # 如果没有需要改进的地方，给出正面反馈
         if not recommendations:
@@ -2967,20 +3826,16 @@ class AIFusionQualityAnalyzer:
         overall_imp = dimension_improvements['overall']['absolute_improvement_vs_avg']
         overall_pct = dimension_improvements['overall']['percentage_improvement_vs_avg']
 
-        # 找出提升最大的维度
-        best_improved_dim = None
-        best_improvement = -999
-        for dim, imp_data in dimension_improvements.items():
-            if dim != 'overall' and imp_data['absolute_improvement_vs_avg'] > best_improvement:
-                best_improvement = imp_data['absolute_improvement_vs_avg']
-                best_improved_dim = dim
-
-        dim_name_map = {
-            'completeness': '完整性',
-            'accuracy': '准确性',
-            'clarity': '清晰度',
-            'relevance': '相关性'
-        }
+        # 找出提升最大的维度（并列时取先出现的维度）
+        best_improved_dim, best_improvement = max(
+            (
+                (dim, imp_data['absolute_improvement_vs_avg'])
+                for dim, imp_data in dimension_improvements.items()
+                if dim != 'overall'
+            ),
+            key=itemgetter(1),
+            default=(None, -999)
+        )
 
         summary_parts = []
 
@@ -3001,7 +3856,7 @@ class AIFusionQualityAnalyzer:
         # 第二部分：最佳提升维度
         if best_improved_dim and best_improvement > 0.2:
             summary_parts.append(
-                f"{dim_name_map[best_improved_dim]}提升最为显著({best_improvement:+.1f}分)"
+                f"{_DIMENSION_LABELS[best_improved_dim]}提升最为显著({best_improvement:+.1f}分)"
             )
 
         # 第三部分：价值评估
@@ -3035,55 +3890,54 @@ class AIFusionQualityAnalyzer:
             速度-质量权衡分析结果
         """
 
-        # 1. 提取成功响应的模型数据
-        model_data = []
+        # 1. 按列（SoA）收集成功响应的模型数据，每个字段一条列表
+        model_data: Dict[str, List[Any]] = {field: [] for field in _TRADEOFF_FIELDS}
+        names = model_data['model_name']
+        times = model_data['response_time']
+        qualities = model_data['quality_score']
+        efficiencies = model_data['efficiency_score']
         for response in llm_responses:
             if response.get('success') and response['model_name'] in llm_evaluations:
                 model_name = response['model_name']
                 response_time = response.get('response_time', 0)
                 quality_metrics = llm_evaluations[model_name]
-
-                model_data.append({
-                    'model_name': model_name,
-                    'response_time': response_time,
-                    'quality_score': quality_metrics.overall_score,
-                    'completeness': quality_metrics.completeness_score,
-                    'accuracy': quality_metrics.accuracy_score,
-                    'clarity': quality_metrics.clarity_score,
-                    'relevance': quality_metrics.relevance_score
-                })
-
-        if not model_data:
+                quality_score = quality_metrics.overall_score
+
+                names.append(model_name)
+                times.append(response_time)
+                qualities.append(quality_score)
+                model_data['completeness'].append(quality_metrics.completeness_score)
+                model_data['accuracy'].append(quality_metrics.accuracy_score)
+                model_data['clarity'].append(quality_metrics.clarity_score)
+                model_data['relevance'].append(quality_metrics.relevance_score)
+                # 2. 效率得分 = 质量分数 / 响应时间（秒）
+                efficiencies.append(quality_score / response_time if response_time > 0 else 0)
+
+        if not names:
             return {
                 'available': False,
                 'message': '没有足够的数据进行速度-质量权衡分析'
             }
 
-        # 2. 计算效率指标（质量/时间）
-        for model in model_data:
-            if model['response_time'] > 0:
-                # 效率得分 = 质量分数 / 响应时间（秒）
-                model['efficiency_score'] = model['quality_score'] / model['response_time']
-            else:
-                model['efficiency_score'] = 0
+        def row(index: int) -> Dict[str, Any]:
+            return {field: column[index] for field, column in model_data.items()}
 
-        # 3. 识别各类最佳模型
-        fastest_model = min(model_data, key=lambda x: x['response_time'])
-        highest_quality_model = max(model_data, key=lambda x: x['quality_score'])
-        most_efficient_model = max(model_data, key=lambda x: x['efficiency_score'])
+        # 3. 识别各类最佳模型（min/max 在列上以 C 循环完成，index 取首个命中，与按 key 比较一致）
+        fastest_model = row(times.index(min(times)))
+        highest_quality_model = row(qualities.index(max(qualities)))
+        most_efficient_model = row(efficiencies.index(max(efficiencies)))
 
         # 4. 计算统计数据
-        avg_response_time = sum(m['response_time'] for m in model_data) / len(model_data)
-        avg_quality_score = sum(m['quality_score'] for m in model_data) / len(model_data)
-        avg_efficiency = sum(m['efficiency_score'] for m in model_data) / len(model_data)
+        count = len(names)
+        avg_response_time = sum(times) / count
+        avg_quality_score = sum(qualities) / count
+        avg_efficiency = sum(efficiencies) / count
 
         # 5. 模型分类（快速型、质量型、平衡型）
-        model_categories = self._categorize_models(
-            model_data, avg_response_time, avg_quality_score, avg_efficiency
-        )
+        model_categories = self._categorize_models(model_data, avg_response_time, avg_quality_score)
 
         # 6. 相关性分析（速度与质量的关系）
-        correlation_analysis = self._analyze_speed_quality_correlation(model_data)
+        correlation_analysis = self._analyze_speed_quality_correlation(times, qualities)
 
         # 7. 场景化推荐
         scenario_recommendations = self._generate_scenario_recommendations(
@@ -3122,10 +3976,10 @@ class AIFusionQualityAnalyzer:
                 'avg_efficiency': avg_efficiency,
                 'speed_range': {
                     'min': fastest_model['response_time'],
-                    'max': max(m['response_time'] for m in model_data)
+                    'max': max(times)
                 },
                 'quality_range': {
-                    'min': min(m['quality_score'] for m in model_data),
+                    'min': min(qualities),
                     'max': highest_quality_model['quality_score']
                 }
             },
@@ -3133,43 +3987,38 @@ class AIFusionQualityAnalyzer:
             'correlation_analysis': correlation_analysis,
             'scenario_recommendations': scenario_recommendations,
             'tradeoff_assessment': tradeoff_assessment,
-            'all_models_data': model_data  # 完整数据供进一步分析
+            'all_models_data': model_data  # 完整数据（按列存储）供进一步分析
         }
 
     def _categorize_models(
         self,
-        model_data: List[Dict],
+        model_data: Dict[str, List[Any]],
         avg_time: float,
-        avg_quality: float,
-        avg_efficiency: float
+        avg_quality: float
     ) -> Dict[str, List[str]]:
-        """将模型分类为快速型、质量型、平衡型"""
+        """将模型分类为快速型、质量型、平衡型（model_data 为按列存储的模型数据）"""
 
         fast_models = []
         quality_models = []
         balanced_models = []
 
-        for model in model_data:
-            time = model['response_time']
-            quality = model['quality_score']
-            efficiency = model['efficiency_score']
-
-            # 快速型：响应时间显著低于平均值
-            is_fast = time < avg_time * 0.8
-            # 质量型：质量显著高于平均值
-            is_high_quality = quality > avg_quality * 1.1
-            # 平衡型：效率高于平均值
-            is_balanced = efficiency > avg_efficiency
-
-            if is_fast and not is_high_quality:
-                fast_models.append(model['model_name'])
-            elif is_high_quality and not is_fast:
-                quality_models.append(model['model_name'])
-            elif is_balanced or (is_fast and is_high_quality):
-                balanced_models.append(model['model_name'])
+        # 快速型：响应时间显著低于平均值；质量型：质量显著高于平均值
+        fast_cutoff = avg_time * 0.8
+        quality_cutoff = avg_quality * 1.1
+
+        for model_name, response_time, quality in zip(
+            model_data['model_name'], model_data['response_time'], model_data['quality_score']
+        ):
+            is_fast = response_time < fast_cutoff
+            is_high_quality = quality > quality_cutoff
+
+            if is_fast == is_high_quality:
+                # 两者兼具或都不突出，归类到平衡型
+                balanced_models.append(model_name)
+            elif is_fast:
+                fast_models.append(model_name)
             else:
-                # 默认归类到平衡型
-                balanced_models.append(model['model_name'])
+                quality_models.append(model_name)
 
         return {
             'fast_models': fast_models,
@@ -3177,32 +4026,37 @@ class AIFusionQualityAnalyzer:
             'balanced_models': balanced_models
         }
 
-    def _analyze_speed_quality_correlation(self, model_data: List[Dict]) -> Dict[str, Any]:
+    def _analyze_speed_quality_correlation(self, times: List[float], qualities: List[float]) -> Dict[str, Any]:
         """分析速度与质量的相关性"""
 
-        if len(model_data) < 2:
+        if len(times) < 2:
             return {
                 'correlation_type': 'insufficient_data',
                 'description': '数据不足，无法分析相关性'
             }
 
-        # 简单的相关性分析
-        times = [m['response_time'] for m in model_data]
-        qualities = [m['quality_score'] for m in model_data]
-
         # 计算排序一致性（快的是否质量也高）
         time_ranks = self._get_ranks(times, reverse=True)  # 时间越短排名越高
         quality_ranks = self._get_ranks(qualities, reverse=False)  # 质量越高排名越高
 
-        # 计算rank相关性（简化版Spearman相关）
-        rank_diffs = sum(abs(time_ranks[i] - quality_ranks[i]) for i in range(len(model_data)))
-        max_diff = len(model_data) * (len(model_data) - 1)
-        similarity = 1 - (rank_diffs / max_diff) if max_diff > 0 else 0
+        # Spearman 秩相关：对平均秩计算 Pearson 相关系数（并列值时仍然准确），rho > 0 表示越快的模型质量越高
+        n = len(times)
+        time_mean = sum(time_ranks) / n
+        quality_mean = sum(quality_ranks) / n
+        time_dev = [r - time_mean for r in time_ranks]
+        quality_dev = [r - quality_mean for r in quality_ranks]
+        time_var = sum(d * d for d in time_dev)
+        quality_var = sum(d * d for d in quality_dev)
+        # 任一列完全相同时没有可比较的差异，相关系数无定义
+        if time_var == 0 or quality_var == 0:
+            rho = 0.0
+        else:
+            rho = sum(t * q for t, q in zip(time_dev, quality_dev)) / math.sqrt(time_var * quality_var)
 
-        if similarity > 0.6:
+        if rho > 0.3:
             correlation_type = 'positive'
             description = '速度快的模型往往质量也较高（正相关）'
-        elif similarity < 0.4:
+        elif rho < -0.3:
             correlation_type = 'negative'
             description = '速度快的模型质量相对较低（负相关/权衡关系）'
         else:
@@ -3211,16 +4065,23 @@ class AIFusionQualityAnalyzer:
 
         return {
             'correlation_type': correlation_type,
-            'similarity_score': similarity,
+            'spearman_rho': rho,
             'description': description
         }
 
-    def _get_ranks(self, values: List[float], reverse: bool = False) -> List[int]:
-        """获取数值的排名"""
-        sorted_indices = sorted(range(len(values)), key=lambda i: values[i], reverse=reverse)
-        ranks = [0] * len(values)
-        for rank, idx in enumerate(sorted_indices):
-            ranks[idx] = rank
+    def _get_ranks(self, values: List[float], reverse: bool = False) -> List[float]:
+        """获取数值的排名，并列值取平均秩，结果与输入顺序无关"""
+        order = sorted(range(len(values)), key=values.__getitem__, reverse=reverse)
+        ranks = [0.0] * len(values)
+        start = 0
+        while start < len(order):
+            end = start
+            while end + 1 < len(order) and values[order[end + 1]] == values[order[start]]:
+                end += 1
+            average_rank = (start + end) / 2
+            for position in range(start, end + 1):
+                ranks[order[position]] = average_rank
+            start = end + 1
         return ranks
 
     def _generate_scenario_recommendations(
@@ -3232,29 +4093,12 @@ class AIFusionQualityAnalyzer:
     ) -> Dict[str, str]:
         """生成场景化推荐"""
 
-        recommendations = {}
-
-        # 时间敏感场景
-        recommendations['time_critical'] = (
-            f"推荐使用 {fastest['model_name']} "
-            f"(响应时间: {fastest['response_time']:.2f}秒, "
-            f"质量: {fastest['quality_score']:.1f}/10)"
-        )
-
-        # 质量优先场景
-        recommendations['quality_critical'] = (
-            f"推荐使用 {highest_quality['model_name']} "
-            f"(质量: {highest_quality['quality_score']:.1f}/10, "
-            f"响应时间: {highest_quality['response_time']:.2f}秒)"
-        )
-
-        # 综合场景（性价比）
-        recommendations['balanced'] = (
-            f"推荐使用 {most_efficient['model_name']} "
-            f"(效率得分: {most_efficient['efficiency_score']:.2f}, "
-            f"质量: {most_efficient['quality_score']:.1f}/10, "
-            f"响应时间: {most_efficient['response_time']:.2f}秒)"
-        )
+        recommendations = {
+            # 时间敏感场景 / 质量优先场景 / 综合场景（性价比）：模板直接按模型行数据填充
+            'time_critical': _TIME_CRITICAL_TEMPLATE.format_map(fastest),
+            'quality_critical': _QUALITY_CRITICAL_TEMPLATE.format_map(highest_quality),
+            'balanced': _BALANCED_TEMPLATE.format_map(most_efficient),
+        }
 
         # 生产环境推荐
         if categories['balanced_models']:
@@ -3351,8 +4195,8 @@ class AIFusionQualityAnalyzer:
                         resolved = candidate
                         break
             except Exception as exc:
-                print(f"⚠️ 评估模型可用性检测失败: {exc}")
+                logger.warning("⚠️ 评估模型可用性检测失败: %s", exc)
 
         self._resolved_evaluator_model = resolved or self.evaluator_model
-        print(f"🧪 使用质量评估模型: {self._resolved_evaluator_model}")
+        logger.info("🧪 使用质量评估模型: %s", self._resolved_evaluator_model)
         return self._resolved_evaluator_model
@@ -1,16 +1,30 @@
 #!/usr/bin/env python3
 """AI Fusion FastAPI 服务"""
 
+import asyncio
+import logging
 import os
+import time
+from collections import OrderedDict
 from contextlib import asynccontextmanager
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from fastapi import FastAPI, HTTPException
+# 进度日志级别由 LOG_LEVEL 控制，生产环境可设为 WARNING 关闭
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+
+from fastapi import FastAPI, HTTPException, Request, Response
 from pydantic import BaseModel
 from flow import create_ai_fusion_flow
 
+try:
+    import orjson  # noqa: F401  仅用于检测是否可用
+    from fastapi.responses import ORJSONResponse as _DefaultResponse
+except ImportError:  # 可选依赖，未安装时使用标准库 json 序列化
+    from fastapi.responses import JSONResponse as _DefaultResponse
+
 
 def check_env():
     """检查环境变量"""
@@ -21,14 +35,65 @@ def check_env():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
-    # 启动时检查
+    # 启动时检查，通过后再构建流程（只构建一次，所有请求共用）
     check_env()
+    app.state.flow = create_ai_fusion_flow()
     yield
     # 关闭时清理（如果需要）
 
 
-app = FastAPI(title="AI Fusion API", version="1.0.0", lifespan=lifespan)
-flow = create_ai_fusion_flow()
+app = FastAPI(
+    title="AI Fusion API",
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=_DefaultResponse,
+)
+
+# ============================================
+# 问答结果缓存（进程内 LRU + TTL）
+# ============================================
+
+# 相同问题（去除首尾空白、忽略大小写）在 TTL 内直接返回上次结果；QUERY_CACHE_TTL=0 关闭
+_QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+_QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1000"))
+_query_cache: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+# 正在执行的问题：同一问题的并发请求共享一次流程执行，避免缓存未命中时重复调用
+_query_inflight: Dict[str, "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+def _query_cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """读取未过期的缓存结果"""
+    entry = _query_cache.get(key)
+    if entry is None:
+        return None
+    created_at, result = entry
+    if time.time() - created_at > _QUERY_CACHE_TTL:
+        del _query_cache[key]
+        return None
+    _query_cache.move_to_end(key)
+    return result
+
+
+def _query_cache_set(key: str, result: Dict[str, Any]) -> None:
+    """写入缓存，超出容量时淘汰最久未使用的条目"""
+    _query_cache[key] = (time.time(), result)
+    _query_cache.move_to_end(key)
+    while len(_query_cache) > _QUERY_CACHE_SIZE:
+        _query_cache.popitem(last=False)
+
+
+async def _run_query(flow, question: str, cache_key: Optional[str]) -> Dict[str, Any]:
+    """执行完整流程；仅在融合成功生成最终回答时写入缓存"""
+    shared = {"user_question": question}
+    await flow.run_async(shared)
+    result = {
+        "answer": shared.get("final_answer", "处理失败"),
+        "models": [m.name for m in shared.get("selected_models", [])],
+    }
+    # 融合失败时的回退回答不写入缓存，避免一次瞬时错误在整个TTL内被重复返回
+    if cache_key is not None and shared.get("fusion_ok"):
+        _query_cache_set(cache_key, result)
+    return result
 
 
 class Question(BaseModel):
@@ -42,18 +107,34 @@ async def health():
 
 
 @app.post("/query")
-async def query(q: Question):
+async def query(q: Question, request: Request, response: Response):
     """提交问题"""
     if not q.question.strip():
         raise HTTPException(status_code=400, detail="问题不能为空")
 
+    flow = request.app.state.flow
+    if _QUERY_CACHE_TTL <= 0:
+        try:
+            return await _run_query(flow, q.question, None)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    cache_key = q.question.strip().lower()
+    cached = _query_cache_get(cache_key)
+    if cached is not None:
+        response.headers["X-Cache"] = "HIT"
+        return cached
+
+    response.headers["X-Cache"] = "MISS"
+    task = _query_inflight.get(cache_key)
+    if task is None:
+        task = asyncio.ensure_future(_run_query(flow, q.question, cache_key))
+        _query_inflight[cache_key] = task
+        task.add_done_callback(lambda _: _query_inflight.pop(cache_key, None))
+
     try:
-        shared = {"user_question": q.question}
-        await flow.run_async(shared)
-        return {
-            "answer": shared.get("final_answer", "处理失败"),
-            "models": [m.name for m in shared.get("selected_models", [])],
-        }
+        # shield：单个客户端断开不会取消其他请求共享的执行
+        return await asyncio.shield(task)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -63,10 +144,15 @@ if __name__ == "__main__":
 
     host = "127.0.0.1"
     port = 8000
+    # DEV=1 时开启热重载（单进程）；否则按 WORKERS 启动多进程，默认与 CPU 核数相同
+    dev_mode = os.getenv("DEV") == "1"
+    workers = 1 if dev_mode else int(os.getenv("WORKERS") or os.cpu_count() or 1)
 
     print("\n🚀 正在启动 AI Fusion API 服务...")
     print(f"📡 服务地址: http://{host}:{port}")
     print(f"📚 API 文档: http://localhost:{port}/docs")
-    print(f"🔍 健康检查: http://localhost:{port}/health\n")
+    print(f"🔍 健康检查: http://localhost:{port}/health")
+    print(f"⚙️ 运行模式: {'开发（热重载）' if dev_mode else f'{workers} 个 worker'}\n")
 
-    uvicorn.run("app:app", host=host, port=port, reload=True)
+    # loop/http 使用 auto：安装了 uvloop、httptools（uvicorn[standard]）时自动启用
+    uvicorn.run("app:app", host=host, port=port, reload=dev_mode, workers=workers, loop="auto", http="auto")
@@ -3,7 +3,9 @@ Langfuse 追踪工具
 用于监控所有大模型调用，记录输入输出和 Token 消耗
 """
 
+import logging
 import os
+import zlib
 from typing import Optional, Dict, Any, List
 
 from dotenv import load_dotenv
@@ -12,6 +14,62 @@ from langfuse.types import TraceContext
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# 是否配置了 Langfuse（导入时确定一次）；未配置时便捷函数直接返回，不再构建 tracer
+_ENABLED = bool(
+    os.getenv("LANGFUSE_PUBLIC_KEY") and os.getenv("LANGFUSE_SECRET_KEY") and os.getenv("LANGFUSE_HOST")
+)
+
+
+def _read_sample_rate() -> float:
+    """读取 LANGFUSE_SAMPLE_RATE（0-1），未配置或非法时为 1.0（全量追踪）"""
+    raw = os.getenv("LANGFUSE_SAMPLE_RATE")
+    if not raw:
+        return 1.0
+    try:
+        return max(0.0, min(1.0, float(raw)))
+    except ValueError:
+        logger.warning("⚠️ LANGFUSE_SAMPLE_RATE 配置无效: %s，使用全量追踪", raw)
+        return 1.0
+
+
+def _read_max_field_chars() -> int:
+    """读取 LANGFUSE_MAX_FIELD_CHARS，未配置或非法时为 16384；0 或负数表示不截断"""
+    raw = os.getenv("LANGFUSE_MAX_FIELD_CHARS")
+    if not raw:
+        return 16384
+    try:
+        return int(raw)
+    except ValueError:
+        logger.warning("⚠️ LANGFUSE_MAX_FIELD_CHARS 配置无效: %s，使用默认值 16384", raw)
+        return 16384
+
+
+# 上报到 Langfuse 的单个字符串字段最大字符数，超出时保留首尾；0 表示不截断
+_MAX_FIELD_CHARS = _read_max_field_chars()
+
+
+def _truncate_payload(data: Any, limit: int = _MAX_FIELD_CHARS) -> Any:
+    """截断 input/output 中过长的字符串（保留首尾各一半），无需截断时原样返回同一对象"""
+    if limit <= 0:
+        return data
+    if isinstance(data, str):
+        if len(data) <= limit:
+            return data
+        half = limit // 2
+        # 用 len(data) - half 取尾部：half 为 0 时 data[-0:] 会返回整个字符串
+        return f"{data[:half]}...[truncated {len(data) - 2 * half} chars]...{data[len(data) - half:]}"
+    if isinstance(data, dict):
+        truncated = {key: _truncate_payload(value, limit) for key, value in data.items()}
+        changed = any(truncated[key] is not value for key, value in data.items())
+        return truncated if changed else data
+    if isinstance(data, (list, tuple)):
+        truncated = [_truncate_payload(item, limit) for item in data]
+        changed = any(new is not old for new, old in zip(truncated, data))
+        return truncated if changed else data
+    return data
+
 
 class LangfuseTracer:
     """Langfuse 追踪器封装类（兼容新版 SDK）"""
@@ -22,29 +80,43 @@ class LangfuseTracer:
         secret_key = os.getenv("LANGFUSE_SECRET_KEY")
         host = os.getenv("LANGFUSE_HOST")
 
-        self.enabled = all([public_key, secret_key, host])
+        self.enabled = bool(public_key and secret_key and host)
+        # 只有启用且初始化成功时 client 才非空，各 helper 只需检查 client
         self.client: Optional[Langfuse] = None
+        self.sample_rate = _read_sample_rate()
+        # 自上次 flush 以来成功提交的 observation 事件数，为 0 时 flush 不发请求
+        self._pending = 0
 
         if not self.enabled:
-            print("⚠️ Langfuse 未配置，追踪功能已禁用")
+            logger.info("⚠️ Langfuse 未配置，追踪功能已禁用")
             return
 
         try:
-            # Langfuse >=2.0 推荐使用 base_url 参数
+            # Langfuse >=2.0 推荐使用 base_url 参数；导出按批次进行，摊薄单次调用的网络开销
             self.client = Langfuse(
                 public_key=public_key,
                 secret_key=secret_key,
                 base_url=host,
+                flush_at=int(os.getenv("LANGFUSE_FLUSH_AT", "50")),
+                flush_interval=float(os.getenv("LANGFUSE_FLUSH_INTERVAL", "5")),
             )
-            print("✅ Langfuse 追踪已启用")
+            logger.info("✅ Langfuse 追踪已启用")
         except Exception as exc:
-            print(f"⚠️ Langfuse 初始化失败: {exc}")
+            logger.warning("⚠️ Langfuse 初始化失败: %s", exc)
             self.enabled = False
 
     # ------------------------------------------------------------------ #
     # Trace & Span helpers
     # ------------------------------------------------------------------ #
 
+    def is_sampled(self, trace_id: Optional[str]) -> bool:
+        """按 trace_id 确定性采样，同一 trace 下的所有 observation 结论一致"""
+        if not trace_id:
+            return False
+        if self.sample_rate >= 1.0:
+            return True
+        return zlib.crc32(trace_id.encode("utf-8")) % 1000 < self.sample_rate * 1000
+
     def create_trace(
         self,
         name: str,
@@ -52,27 +124,41 @@ class LangfuseTracer:
         user_id: Optional[str] = None,
         metadata: Optional[Dict[str, Any]] = None,
         input_data: Optional[Any] = None,
+        seed: Optional[str] = None,
     ) -> Optional[LangfuseSpan]:
         """
         创建一个新的根 span 作为 trace，对应一次完整的工作流运行。
+
+        传入 seed 时 trace_id 由 seed 确定性生成（本地计算，无网络请求），相同 seed 的多次运行归入同一 trace。
         """
-        if not self.enabled or not self.client:
+        if self.client is None:
             return None
 
-        meta = dict(metadata or {})
+        meta = metadata
         if user_id:
-            meta["user_id"] = user_id
+            # 只有需要注入 user_id 时才复制，避免修改调用方传入的字典
+            meta = {**(metadata or {}), "user_id": user_id}
 
         try:
+            trace_context: Optional[TraceContext] = None
+            if seed or self.sample_rate < 1.0:
+                # 本地生成 trace_id 并在根部做采样（head-based）：未采中时整条 trace 都不创建，
+                # 子 span/generation 按同一 trace_id 判断，结论与根部一致
+                trace_id = Langfuse.create_trace_id(seed=seed) if seed else Langfuse.create_trace_id()
+                if not self.is_sampled(trace_id):
+                    return None
+                trace_context = {"trace_id": trace_id}
             span = self.client.start_observation(
+                trace_context=trace_context,
                 name=name,
                 as_type="span",
-                input=input_data,
+                input=_truncate_payload(input_data),
                 metadata=meta or None,
             )
+            self._pending += 1
             return span
         except Exception as exc:
-            print(f"⚠️ 创建 trace 失败: {exc}")
+            logger.warning("⚠️ 创建 trace 失败: %s", exc)
             return None
 
     def create_span(
@@ -85,7 +171,7 @@ class LangfuseTracer:
         metadata: Optional[Dict[str, Any]] = None,
     ) -> Optional[LangfuseSpan]:
         """在指定 trace 下创建一个子 span（用于节点级别追踪）"""
-        if not self.enabled or not self.client or not trace_id:
+        if self.client is None or not self.is_sampled(trace_id):
             return None
 
         trace_context: TraceContext = {"trace_id": trace_id}
@@ -97,12 +183,13 @@ class LangfuseTracer:
                 trace_context=trace_context,
                 name=name,
                 as_type="span",
-                input=input_data,
+                input=_truncate_payload(input_data),
                 metadata=metadata or None,
             )
+            self._pending += 1
             return span
         except Exception as exc:
-            print(f"⚠️ 创建 span 失败: {exc}")
+            logger.warning("⚠️ 创建 span 失败: %s", exc)
             return None
 
     def start_generation(
@@ -117,7 +204,7 @@ class LangfuseTracer:
         model_parameters: Optional[Dict[str, Any]] = None,
     ) -> Optional[LangfuseGeneration]:
         """开始一次模型调用的 generation 追踪"""
-        if not self.enabled or not self.client or not trace_id:
+        if self.client is None or not self.is_sampled(trace_id):
             return None
 
         trace_context: TraceContext = {"trace_id": trace_id}
@@ -129,14 +216,15 @@ class LangfuseTracer:
                 trace_context=trace_context,
                 name=name,
                 as_type="generation",
-                input=input_messages,
+                input=_truncate_payload(input_messages),
                 metadata=metadata or None,
                 model=model,
                 model_parameters=model_parameters or None,
             )
+            self._pending += 1
             return generation
         except Exception as exc:
-            print(f"⚠️ 创建 generation 失败: {exc}")
+            logger.warning("⚠️ 创建 generation 失败: %s", exc)
             return None
 
     def finish_observation(
@@ -150,32 +238,34 @@ class LangfuseTracer:
         status_message: Optional[str] = None,
     ) -> None:
         """统一的 observation 结束逻辑（适用于 span 与 generation）"""
-        if not observation or not self.enabled:
+        if not observation or self.client is None:
             return
 
         try:
             observation.update(
-                output=output_data,
+                output=_truncate_payload(output_data),
                 metadata=metadata or None,
                 usage_details=usage,
                 level=level,
                 status_message=status_message,
             )
         except Exception as exc:
-            print(f"⚠️ 更新 observation 失败: {exc}")
+            logger.warning("⚠️ 更新 observation 失败: %s", exc)
 
         try:
             observation.end()
+            self._pending += 1
         except Exception as exc:
-            print(f"⚠️ 结束 observation 失败: {exc}")
+            logger.warning("⚠️ 结束 observation 失败: %s", exc)
 
     def flush(self):
-        """确保所有数据都已上传到 Langfuse"""
-        if self.enabled and self.client:
+        """确保所有数据都已上传到 Langfuse（没有新事件时跳过，避免空请求）"""
+        if self.client is not None and self._pending:
             try:
                 self.client.flush()
+                self._pending = 0
             except Exception as exc:
-                print(f"⚠️ Langfuse flush 失败: {exc}")
+                logger.warning("⚠️ Langfuse flush 失败: %s", exc)
 
 
 # 全局 tracer 实例
@@ -195,9 +285,14 @@ def create_trace(
     user_id: Optional[str] = None,
     metadata: Optional[Dict[str, Any]] = None,
     input_data: Optional[Any] = None,
+    seed: Optional[str] = None,
 ) -> Optional[LangfuseSpan]:
     """便捷函数：创建 trace"""
-    return get_tracer().create_trace(name, user_id=user_id, metadata=metadata, input_data=input_data)
+    if not _ENABLED:
+        return None
+    return get_tracer().create_trace(
+        name, user_id=user_id, metadata=metadata, input_data=input_data, seed=seed
+    )
 
 
 def create_span(
@@ -208,6 +303,8 @@ def create_span(
     metadata: Optional[Dict[str, Any]] = None,
 ) -> Optional[LangfuseSpan]:
     """便捷函数：创建 span"""
+    if not _ENABLED:
+        return None
     return get_tracer().create_span(
         trace_id,
         name=name,
@@ -227,6 +324,8 @@ def start_generation(
     model_parameters: Optional[Dict[str, Any]] = None,
 ) -> Optional[LangfuseGeneration]:
     """便捷函数：开始记录一次模型 generation"""
+    if not _ENABLED:
+        return None
     return get_tracer().start_generation(
         trace_id,
         name=name,
@@ -248,6 +347,8 @@ def finish_observation(
     status_message: Optional[str] = None,
 ) -> None:
     """便捷函数：结束 span/generation"""
+    if not _ENABLED or observation is None:
+        return
     get_tracer().finish_observation(
         observation,
         output_data=output_data,
@@ -260,4 +361,6 @@ def finish_observation(
 
 def flush():
     """便捷函数：flush 数据"""
+    if not _ENABLED:
+        return
     get_tracer().flush()
@@ -2,15 +2,21 @@
 """AI Fusion 命令行入口"""
 
 import asyncio
+import atexit
+import logging
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from flow import create_ai_fusion_flow
-from providers import ModelRegistry, ModelInfo
-from analyzer import ModelConfig
-from langfuse_tracer import create_trace, finish_observation, flush
+# 分析模块使用 logging 输出进度，默认 INFO 保持与 print 一致的终端体验；服务部署可设为 WARNING
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper(), format="%(message)s")
+
+logger = logging.getLogger(__name__)
+
+# 确定性 trace_id 的时间窗口（秒）：窗口内重复提问视为重试，关联到同一 trace
+_TRACE_SEED_WINDOW = 600
 
 
 def check_env():
@@ -24,11 +30,20 @@ def check_env():
 
 async def chat():
     """交互式聊天"""
+    # 重量级依赖（LLM SDK、Langfuse 等）在环境检查通过后才导入
+    from flow import create_ai_fusion_flow
+    from providers import ModelRegistry
+    from analyzer import ModelConfig
+    from langfuse_tracer import create_trace, finish_observation, flush
+
+    # 异常退出时兜底上报（没有待上报事件时 flush 不发请求）
+    atexit.register(flush)
+
     print("🌟 欢迎使用 AI Fusion!")
     print("输入 'quit' 或 'exit' 退出\n")
 
     # 初始化 ModelRegistry (新架构)
-    print("🔧 正在初始化模型注册中心...")
+    logger.info("🔧 正在初始化模型注册中心...")
     registry = ModelRegistry()
     available_models_info = await registry.discover_all_models()
 
@@ -36,10 +51,10 @@ async def chat():
         print("❌ 未发现任何可用模型，请检查环境配置")
         return
 
-    print(f"✅ 成功加载 {len(available_models_info)} 个模型\n")
+    logger.info("✅ 成功加载 %d 个模型\n", len(available_models_info))
 
-    # 转换 ModelInfo 为 ModelConfig（向后兼容）
-    available_models = [
+    # 转换 ModelInfo 为 ModelConfig（向后兼容）；会话内不变，用元组在各轮 shared 中共享同一对象
+    available_models = tuple(
         ModelConfig(
             name=model.model_id,
             provider=model.provider,
@@ -47,7 +62,7 @@ async def chat():
             base_url=None
         )
         for model in available_models_info
-    ]
+    )
 
     flow = create_ai_fusion_flow()
 
@@ -62,11 +77,12 @@ async def chat():
             if not question:
                 continue
 
-            # 创建 Langfuse trace
+            # 创建 Langfuse trace：同一问题在同一时间窗口内的重试归入同一 trace
             trace = create_trace(
                 name=question[:100],  # 使用问题作为 trace 名称（截断到100字符）
                 metadata={"source": "main_cli"},
-                input_data={"question": question}
+                input_data={"question": question},
+                seed=f"{question}|{int(time.time() // _TRACE_SEED_WINDOW)}",
             )
             trace_id = trace.trace_id if trace else None
             trace_observation_id = trace.id if trace else None
@@ -105,13 +121,12 @@ async def chat():
                         else None,
                         status_message=str(flow_error) if flow_error else None,
                     )
-
-                flush()
+                # 不在每轮同步 flush：SDK 按 LANGFUSE_FLUSH_AT / LANGFUSE_FLUSH_INTERVAL 在后台批量上报
 
             print(f"\n🎯 回答:\n{shared.get('final_answer', '处理失败')}\n")
 
             if trace_id:
-                print(f"📊 Langfuse Trace ID: {trace_id}\n")
+                logger.info("📊 Langfuse Trace ID: %s\n", trace_id)
 
         except KeyboardInterrupt:
             print("\n👋 再见!")
@@ -119,6 +134,9 @@ async def chat():
         except Exception as e:
             print(f"❌ 错误: {e}\n")
 
+    # 会话结束时把剩余事件一次性上报
+    flush()
+
 
 if __name__ == "__main__":
     if check_env():
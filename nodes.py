@@ -14,6 +14,21 @@ from reporter import AIFusionReporter
 from langfuse_tracer import create_span, finish_observation
 
 
+def _reuse_per_registry(instances: Dict[int, Any], registry, factory):
+    """
+    按 registry 复用选择器/分析器实例
+
+    PocketFlow 每次运行都会浅拷贝节点，运行中赋给 self 的属性随拷贝丢弃；
+    instances 字典在节点 __init__ 中创建，所有拷贝共享同一个字典，因此可以跨请求复用
+    """
+    entry = instances.get(id(registry))
+    if entry is None:
+        # 同时持有 registry 引用，保证 id 在缓存期间不会被复用
+        entry = (registry, factory(registry=registry))
+        instances[id(registry)] = entry
+    return entry[1]
+
+
 class ModelSelectorNode(AsyncNode):
     """
     模型选择器节点
@@ -23,6 +38,7 @@ class ModelSelectorNode(AsyncNode):
     def __init__(self):
         super().__init__(max_retries=2, wait=1)
         self.smart_selector = None  # 将在 prep_async 中初始化
+        self._selectors: Dict[int, Any] = {}  # 按 registry 缓存的选择器，跨运行共享
         # 保留传统选择策略作为回退
         self.fallback_criteria = {
             "技术/编程": ["gpt-41-0414-global", "claude_sonnet4", "qwen-max"],
@@ -49,9 +65,8 @@ class ModelSelectorNode(AsyncNode):
         if not available_models:
             raise ValueError("没有可用的模型")
 
-        # 初始化 smart_selector（使用 registry）
-        if self.smart_selector is None:
-            self.smart_selector = AIFusionSmartSelector(registry=registry)
+        # 获取 smart_selector（同一 registry 跨请求复用）
+        self.smart_selector = _reuse_per_registry(self._selectors, registry, AIFusionSmartSelector)
 
         return {
             "question": question,
@@ -536,7 +551,7 @@ class FusionAgentNode(AsyncNode):
                 metadata={"node": "FusionAgent"},
             )
 
-            return fused_answer
+            return {"answer": fused_answer, "fused": True}
 
         except Exception as e:
             print(f"❌ 回答融合失败: {str(e)}")
@@ -547,11 +562,12 @@ class FusionAgentNode(AsyncNode):
                 level="ERROR",
                 status_message=str(e),
             )
-            # 如果融合失败，返回第一个可用的回答
+            # 如果融合失败，返回第一个可用的回答，并标记为未融合以免被缓存
             if responses:
-                return f"融合失败，以下是第一个模型的回答：\n\n{responses[0]['response']}"
+                answer = f"融合失败，以下是第一个模型的回答：\n\n{responses[0]['response']}"
             else:
-                return "抱歉，无法生成回答。"
+                answer = "抱歉，无法生成回答。"
+            return {"answer": answer, "fused": False}
 
     def _build_fusion_prompt(self, question: str, responses: List[Dict], question_type: str) -> str:
         """构建融合提示"""
@@ -582,8 +598,9 @@ class FusionAgentNode(AsyncNode):
 
     async def post_async(self, shared, prep_res, exec_res):
         """后处理阶段：保存融合后的最终回答"""
-        if exec_res:
-            shared["final_answer"] = exec_res
+        if exec_res and exec_res["answer"]:
+            shared["final_answer"] = exec_res["answer"]
+            shared["fusion_ok"] = exec_res["fused"]
             print("✅ 回答融合完成！")
             return "analyze"  # 继续到质量分析节点
 
@@ -599,6 +616,7 @@ class QualityAnalyzerNode(AsyncNode):
     def __init__(self):
         super().__init__(max_retries=2, wait=1)
         self.analyzer = None  # 将在 prep_async 中初始化
+        self._analyzers: Dict[int, Any] = {}  # 按 registry 缓存的分析器，跨运行共享（保留评估缓存）
 
     async def prep_async(self, shared):
         """准备阶段：获取问题、回答和融合结果以及registry"""
@@ -616,9 +634,8 @@ class QualityAnalyzerNode(AsyncNode):
             print("⚠️ 没有LLM回答，跳过质量分析")
             return None
 
-        # 初始化 analyzer（使用 registry）
-        if self.analyzer is None:
-            self.analyzer = AIFusionQualityAnalyzer(registry=registry)
+        # 获取 analyzer（同一 registry 跨请求复用，评估结果缓存得以命中）
+        self.analyzer = _reuse_per_registry(self._analyzers, registry, AIFusionQualityAnalyzer)
 
         return {
             "question": question,
@@ -633,49 +650,16 @@ class QualityAnalyzerNode(AsyncNode):
         if inputs is None:
             return None
 
-        trace_id = inputs.get("trace_id")
-        trace_observation_id = inputs.get("trace_observation_id")
-
-        analysis_span = create_span(
-            trace_id,
-            name="QualityAnalyzer",
-            parent_observation_id=trace_observation_id,
-            input_data={
-                "question": inputs["question"],
-                "final_answer": inputs["final_answer"][:200] if inputs["final_answer"] else "",
-                "response_count": len(inputs["llm_responses"]),
-            },
-            metadata={"node": "QualityAnalyzer"},
-        )
-        parent_observation_id = analysis_span.id if analysis_span else trace_observation_id
-
         print("\n🔍 正在进行质量分析...")
 
-        try:
-            quality_analysis = await self.analyzer.analyze_quality(
-                question=inputs["question"],
-                llm_responses=inputs["llm_responses"],
-                fusion_answer=inputs["final_answer"],
-                trace_id=trace_id,
-                parent_observation_id=parent_observation_id,
-            )
-
-            finish_observation(
-                analysis_span,
-                output_data={"quality_analysis": quality_analysis},
-                metadata={"node": "QualityAnalyzer"},
-            )
-
-            return quality_analysis
-        except Exception as exc:
-            finish_observation(
-                analysis_span,
-                output_data={"error": str(exc)},
-                metadata={"node": "QualityAnalyzer"},
-                level="ERROR",
-                status_message=str(exc),
-            )
-            raise
+        # analyze_quality 内部会创建唯一的 quality_analysis span，这里只传递追踪上下文
+        return await self.analyzer.analyze_quality(
+            question=inputs["question"],
+            llm_responses=inputs["llm_responses"],
+            fusion_answer=inputs["final_answer"],
+            trace_id=inputs.get("trace_id"),
+            parent_observation_id=inputs.get("trace_observation_id"),
+        )
 
     async def post_async(self, shared, prep_res, exec_res):
         """后处理阶段：保存质量分析结果"""
@@ -118,6 +118,12 @@ class BaseProvider(ABC):
         """检查提供商是否可用"""
         pass
 
+    def _client_for_call(self, max_retries: Optional[int] = None):
+        """返回本次调用使用的 SDK 客户端；指定 max_retries 时覆盖 SDK 自带的重试次数"""
+        if max_retries is None:
+            return self.client
+        return self.client.with_options(max_retries=max_retries)
+
     async def get_models(self, force_refresh: bool = False) -> List[ModelInfo]:
         """获取模型列表（带缓存）"""
         if self._models_cache is None or force_refresh:
@@ -326,7 +332,8 @@ class UniversalProvider(BaseProvider):
         if not self.client:
             raise ValueError(f"{self.provider_name} provider is not available")
 
-        response = await self.client.chat.completions.create(
+        client = self._client_for_call(kwargs.pop("max_retries", None))
+        response = await client.chat.completions.create(
             model=model_id,
             messages=messages,
             temperature=temperature,
@@ -424,6 +431,8 @@ class AnthropicProvider(BaseProvider):
         if not self.client:
             raise ValueError(f"{self.provider_name} provider is not available")
 
+        client = self._client_for_call(kwargs.pop("max_retries", None))
+
         # Anthropic 需要将系统消息单独处理
         system_message = None
         chat_messages = []
@@ -434,10 +443,19 @@ class AnthropicProvider(BaseProvider):
             else:
                 chat_messages.append(msg)
 
-        response = await self.client.messages.create(
+        # 系统提示作为固定前缀标记为可缓存，重复调用时复用服务端提示缓存
+        system_blocks = None
+        if system_message:
+            system_blocks = [{
+                "type": "text",
+                "text": system_message,
+                "cache_control": {"type": "ephemeral"},
+            }]
+
+        response = await client.messages.create(
             model=model_id,
             messages=chat_messages if chat_messages else messages,
-            system=system_message,
+            system=system_blocks,
             temperature=temperature,
             max_tokens=max_tokens or 4096,
             **kwargs
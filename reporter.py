@@ -7,6 +7,14 @@ import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 
+# 速度-质量权衡中场景化建议的中文标签
+_SCENARIO_LABELS = {
+    'time_critical': "时间敏感",
+    'quality_critical': "质量优先",
+    'balanced': "综合平衡",
+    'production': "生产环境"
+}
+
 
 class AIFusionReporter:
     """AI Fusion报告生成器"""
@@ -318,12 +326,7 @@ class AIFusionReporter:
             if isinstance(recommendations, dict):
                 items = list(recommendations.items())
                 for key, value in items[:3]:
-                    label = {
-                        'time_critical': "时间敏感",
-                        'quality_critical': "质量优先",
-                        'balanced': "综合平衡",
-                        'production': "生产环境"
-                    }.get(key, key)
+                    label = _SCENARIO_LABELS.get(key, key)
                     section += f"- {label}: {value}\n"
             else:
                 for rec in recommendations[:3]:
@@ -10,7 +10,8 @@ AI Fusion工具函数和配置管理
 
 import os
 import asyncio
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from openai import AsyncOpenAI
 from dotenv import load_dotenv
@@ -29,13 +30,35 @@ class ModelConfig:
     temperature: float = 0.7
 
 
+# 默认模型列表（基于当前项目），未配置 AVAILABLE_MODELS 时使用
+_DEFAULT_MODEL_NAMES = (
+    "qwen-max", "qwen-plus", "claude_sonnet4", "gpt-41-0414-global",
+    "claude37_sonnet_new", "gpt-41-mini-0414-global", "glm-4.5",
+    "openmatrix-qwen3-235b-inst-fp8", "qwen3-max-preview",
+    "gpt-5-mini-0807-global", "qwen3-coder-480b-a35b-instruct",
+    "qwen3-coder-plus1", "qwen3-coder-plus"
+)
+
+
+def _configured_model_names() -> Tuple[str, ...]:
+    """从环境变量 AVAILABLE_MODELS（逗号分隔）读取模型列表，忽略空项；未配置时使用默认列表"""
+    raw = os.getenv("AVAILABLE_MODELS", "")
+    return tuple(name for name in (part.strip() for part in raw.split(",")) if name) or _DEFAULT_MODEL_NAMES
+
+
 def get_available_models() -> List[ModelConfig]:
     """
     获取所有可用的LLM模型配置
     根据环境变量中的API密钥确定可用模型
 
-    向后兼容：保留原有实现
+    向后兼容：保留原有实现；环境变量在进程内只解析一次，每次返回新的列表
     """
+    return list(_configured_models())
+
+
+@lru_cache(maxsize=1)
+def _configured_models() -> Tuple[ModelConfig, ...]:
+    """按环境变量构建模型配置（结果缓存，进程生命周期内不变）"""
     models = []
 
     # OpenAI模型（支持自定义base_url）
@@ -43,20 +66,7 @@ def get_available_models() -> List[ModelConfig]:
     openai_base_url = os.environ.get("OPENAI_BASE_URL")
 
     if openai_key:
-        # 从环境变量或使用默认模型列表
-        if os.getenv("AVAILABLE_MODELS"):
-            model_names = [m.strip() for m in os.getenv("AVAILABLE_MODELS").split(",")]
-        else:
-            # 默认模型列表（基于当前项目）
-            model_names = [
-                "qwen-max", "qwen-plus", "claude_sonnet4", "gpt-41-0414-global",
-                "claude37_sonnet_new", "gpt-41-mini-0414-global", "glm-4.5",
-                "openmatrix-qwen3-235b-inst-fp8", "qwen3-max-preview",
-                "gpt-5-mini-0807-global", "qwen3-coder-480b-a35b-instruct",
-                "qwen3-coder-plus1", "qwen3-coder-plus"
-            ]
-
-        for model_name in model_names:
+        for model_name in _configured_model_names():
             models.append(ModelConfig(
                 name=model_name,
                 provider="openai",
@@ -65,7 +75,7 @@ def get_available_models() -> List[ModelConfig]:
                 max_tokens=2000
             ))
 
-    return models
+    return tuple(models)
 
 
 async def call_llm_async(